@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8; -*-
+"""Report how convert_many scales with the number of worker processes.
+
+Converts the same set of documents with 1, 2, 4... workers and reports the
+documents per second and the speedup over a single process. On a build box
+the speedup should stay close to the number of workers, up to the number
+of cores.
+
+    python benchmarks/bench_batch.py [--documents 2000] [--workers 1,2,4]
+"""
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'rydown'))
+
+from batch import convert_many  # noqa: E402
+
+DOCUMENT = (
+    "Title\n=====\n\n"
+    "A paragraph with *emphasis*, `code` and a [link](http://example.com).\n"
+    "It goes on for a second line.\n\n"
+    "* apples\n  * oranges\n* pears\n\n"
+    "1. one\n2. two\n\n"
+    "    :::python\n    x = 1\n\n"
+)
+
+
+def run(documents, workers):
+    for result in convert_many(documents, workers=workers, chunksize=16):
+        if result.error is not None:
+            raise RuntimeError(result.error)
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument('--documents', type=int, default=2000)
+    cores = multiprocessing.cpu_count()
+    args.add_argument('--workers', default=','.join(
+        str(w) for w in (1, 2, 4, 8, 16) if w <= max(cores, 2)),
+        help='comma separated numbers of worker processes')
+    args.add_argument('--repeat', type=int, default=3)
+    options = args.parse_args(argv)
+    documents = [DOCUMENT] * options.documents
+
+    print('%d CPUs' % cores)
+    print('%8s %12s %14s %10s' % ('workers', 'seconds', 'docs / second',
+                                  'speedup'))
+    first = None
+    for workers in [int(w) for w in options.workers.split(',')]:
+        seconds = min(timeit.repeat(lambda: run(documents, workers),
+                                    number=1, repeat=options.repeat))
+        if first is None:
+            first = seconds
+        print('%8d %12.3f %14.0f %9.2fx' % (workers, seconds,
+                                            len(documents) / seconds,
+                                            first / seconds))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8; -*-
+"""Check that unterminated fences, comments and links lex in linear time.
+
+Lexes documents where fenced code, comments and links never get their
+closing delimiter, doubling the size each step, and reports the time per
+line. These inputs used to make the lexer regexes backtrack for minutes or
+rescan the text at every bracket; now the time per line should stay flat.
+
+    python benchmarks/bench_delimiters.py [--sizes 2000,4000,8000,16000]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'rydown'))
+
+from lexer import MarkdownLexer  # noqa: E402
+
+
+def unterminated_fence(count):
+    return "```python\n" + "x = [i for i in range(10)]  # ~~\n" * count
+
+
+def unterminated_comment(count):
+    return "<!-- a comment\n" + "that goes on -- and on\n" * count
+
+
+def stray_openers(count):
+    # Every line starts a comment that is never closed
+    return "<!-- not closed\n" * count
+
+
+def unbalanced_brackets(count):
+    return "Use array[i] and ![b][j] with [links (that are not)\n" * count
+
+
+def unterminated_link(count):
+    return "[a link that never ends\n" * count + "](url"
+
+
+class _Discard(object):
+    # Swallows the "Illegal character" messages of t_error
+
+    def write(self, text):
+        pass
+
+
+def lex(lexer, text):
+    lexer.reset()
+    lexer.lexer.input(text)
+    stdout, sys.stdout = sys.stdout, _Discard()
+    try:
+        for _ in iter(lexer.lexer.token, None):
+            pass
+    finally:
+        sys.stdout = stdout
+
+
+def measure(lexer, text, repeat):
+    return min(timeit.repeat(lambda: lex(lexer, text), number=1,
+                             repeat=repeat))
+
+
+def report(title, lexer, make, sizes, repeat):
+    print(title)
+    print('%10s %12s %16s %10s' % ('N', 'seconds', 'us per line', 'slowdown'))
+    first = None
+    for size in sizes:
+        seconds = measure(lexer, make(size), repeat)
+        per_item = seconds / size
+        if first is None:
+            first = per_item
+        print('%10d %12.4f %16.2f %9.2fx' % (size, seconds, per_item * 1e6,
+                                              per_item / first))
+    print()
+    return per_item / first
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument('--sizes', default='2000,4000,8000,16000',
+                      help='comma separated document sizes')
+    args.add_argument('--repeat', type=int, default=3)
+    args.add_argument('--tolerance', type=float, default=2.0,
+                      help='fail when the time per line grows more than '
+                      'this factor between the smallest and largest size')
+    options = args.parse_args(argv)
+    sizes = [int(size) for size in options.sizes.split(',')]
+
+    lexer = MarkdownLexer()
+    slowdowns = [
+        report('Unterminated fenced code', lexer, unterminated_fence, sizes,
+               options.repeat),
+        report('Unterminated comment', lexer, unterminated_comment, sizes,
+               options.repeat),
+        report('Stray comment openers', lexer, stray_openers, sizes,
+               options.repeat),
+        report('Unbalanced brackets', lexer, unbalanced_brackets, sizes,
+               options.repeat),
+        report('Unterminated link', lexer, unterminated_link, sizes,
+               options.repeat),
+    ]
+    if max(slowdowns) > options.tolerance:
+        print('Lexing time grows faster than linearly')
+        return 1
+    print('Lexing time is linear in document length')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8; -*-
+"""Compare rendering an edited document in full and incrementally.
+
+Builds a long document (about 50 pages by default), then edits one
+paragraph, and reports the time to render the whole document again and
+the time IncrementalDocument.update takes for the same edit.
+
+    python benchmarks/bench_incremental.py [--sections 600]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'rydown'))
+
+from engine import Engine  # noqa: E402
+from incremental import IncrementalDocument  # noqa: E402
+
+SECTION = (
+    "Section %d\n---------\n\n"
+    "Paragraph %d with *emphasis*, `code` and a [reference][site].\n"
+    "It goes on for a second line.\n\n"
+    "* apples\n  * oranges\n* pears\n\n"
+    "    :::python\n    x = %d\n\n"
+)
+
+
+def document(sections):
+    return (''.join([SECTION % (i, i, i) for i in range(sections)]) +
+            "[site]: http://example.com/\n")
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument('--sections', type=int, default=600)
+    args.add_argument('--repeat', type=int, default=5)
+    options = args.parse_args(argv)
+    source = document(options.sections)
+    middle = options.sections // 2
+    edits = [source.replace('Paragraph %d ' % middle, 'Edited %d ' % n)
+             for n in range(2)]
+
+    engine = Engine()
+    full = min(timeit.repeat(lambda: engine.to_mediawiki(edits[0]),
+                             number=1, repeat=options.repeat))
+    doc = IncrementalDocument(engine=engine)
+    doc.update(source)
+    times = []
+    for i in range(options.repeat):
+        times.append(timeit.timeit(lambda: doc.update(edits[i % 2]),
+                                   number=1))
+    print('%d bytes, %d pieces re-rendered per edit' % (len(source),
+                                                        doc.parsed))
+    print('%-12s %10.2f ms' % ('full', full * 1e3))
+    print('%-12s %10.2f ms' % ('incremental', min(times) * 1e3))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
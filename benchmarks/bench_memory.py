@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8; -*-
+"""Report the memory allocated while parsing a document.
+
+Parses indented documents (nested lists, indented text) of growing size
+into list trees and typed trees (MarkdownParser(typed_nodes=True)) and
+reports, per MB of input, the peak memory while parsing and the memory
+still held by the tree, measured with tracemalloc, and the parse time per
+section. The peak includes the tree and any copy of the input the parser
+makes or holds on to. Needs Python 3.
+
+    python benchmarks/bench_memory.py [--sizes 1000,4000,16000]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'rydown'))
+
+from parser import MarkdownParser  # noqa: E402
+
+SECTION = (
+    "A paragraph  with  double  spaces and\ta tab.\n\n"
+    "* apples\n"
+    "  * oranges\n"
+    "    * pears\n"
+    "\t* bananas\n\n"
+)
+
+
+def indented(count):
+    return SECTION * count
+
+
+def memory(parser, text):
+    # Returns the memory held by the tree and the peak while parsing
+    tracemalloc.start()
+    try:
+        tree = parser.parse(text)
+        held, peak = tracemalloc.get_traced_memory()
+        return held, peak
+    finally:
+        tracemalloc.stop()
+
+
+def seconds(parser, text, repeat):
+    return min(timeit.repeat(lambda: parser.parse(text), number=1,
+                             repeat=repeat))
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument('--sizes', default='1000,4000,16000',
+                      help='comma separated numbers of sections')
+    args.add_argument('--repeat', type=int, default=3)
+    options = args.parse_args(argv)
+    sizes = [int(size) for size in options.sizes.split(',')]
+
+    parsers = [('lists', MarkdownParser()),
+               ('typed', MarkdownParser(typed_nodes=True))]
+    print('%10s %12s %6s %12s %12s %16s' % ('sections', 'input bytes',
+                                             'tree', 'peak MB/MB',
+                                             'tree MB/MB', 'us per section'))
+    for size in sizes:
+        text = indented(size)
+        for name, parser in parsers:
+            held, peak = memory(parser, text)
+            per_section = seconds(parser, text, options.repeat) / size
+            print('%10d %12d %6s %12.2f %12.2f %16.2f' % (
+                size, len(text), name, float(peak) / len(text),
+                float(held) / len(text), per_section * 1e6))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8; -*-
+"""Check that parse time grows linearly with the document length.
+
+Parses documents made of N paragraphs and a single paragraph made of N
+phrases, doubling N each step, and reports the time per block/phrase. For
+a linear parser that time stays flat; the slowdown column is relative to
+the smallest size.
+
+    python benchmarks/bench_parse.py [--sizes 2000,4000,8000,16000]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'rydown'))
+
+from parser import MarkdownParser  # noqa: E402
+
+
+def many_blocks(count):
+    return "A short paragraph with *some* emphasis.\n\n" * count
+
+
+def many_phrases(count):
+    return "word *em* " * (count // 2) + "\n\n"
+
+
+def measure(parser, text, repeat):
+    return min(timeit.repeat(lambda: parser.parse(text), number=1,
+                             repeat=repeat))
+
+
+def report(title, parser, make, sizes, repeat):
+    print(title)
+    print('%10s %12s %16s %10s' % ('N', 'seconds', 'us per item', 'slowdown'))
+    first = None
+    for size in sizes:
+        seconds = measure(parser, make(size), repeat)
+        per_item = seconds / size
+        if first is None:
+            first = per_item
+        print('%10d %12.4f %16.2f %9.2fx' % (size, seconds, per_item * 1e6,
+                                              per_item / first))
+    print()
+    return per_item / first
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument('--sizes', default='2000,4000,8000,16000',
+                      help='comma separated document sizes')
+    args.add_argument('--repeat', type=int, default=3)
+    args.add_argument('--tolerance', type=float, default=2.0,
+                      help='fail when the time per item grows more than '
+                      'this factor between the smallest and largest size')
+    options = args.parse_args(argv)
+    sizes = [int(size) for size in options.sizes.split(',')]
+
+    parser = MarkdownParser()
+    slowdowns = [
+        report('Blocks per document', parser, many_blocks, sizes,
+               options.repeat),
+        report('Phrases per paragraph', parser, many_phrases, sizes,
+               options.repeat),
+    ]
+    if max(slowdowns) > options.tolerance:
+        print('Parse time grows faster than linearly')
+        return 1
+    print('Parse time is linear in document length')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
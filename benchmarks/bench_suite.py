@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8; -*-
+"""Time each phase of a conversion and compare with a baseline.
+
+Generates documents of several sizes with corpus.py and times lexing,
+parsing (lexing included, PLY drives the lexer), the r_node pass and
+serializing to HTML and to MediaWiki, reporting microseconds per KB of
+Markdown. With --baseline, every phase is compared with the saved
+results and the run fails when one got slower than the tolerance allows.
+Timings depend on the machine: save a baseline on the machine that
+checks against it.
+
+    python benchmarks/bench_suite.py [--sizes 10000,100000] [--mix table=5]
+        [--save baseline.json] [--baseline baseline.json] [--tolerance 0.25]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'rydown'))
+
+import corpus  # noqa: E402
+import highlight  # noqa: E402
+import serializer  # noqa: E402
+from parser import MarkdownParser  # noqa: E402
+
+PHASES = ('lex', 'parse', 'r_node', 'html', 'mediawiki')
+SERIALIZERS = (('html', serializer.serialize),
+               ('mediawiki', serializer.mediawiki_serialize))
+
+
+def lex(markdown_parser, text):
+    lexer = markdown_parser.lexer
+    lexer.reset()
+    lexer.lexer.input(text)
+    for _ in iter(lexer.lexer.token, None):
+        pass
+
+
+def parse(markdown_parser, text):
+    # What MarkdownParser.parse does before r_node
+    markdown_parser.max_heading_level = 0
+    markdown_parser.ref_link_table = {}
+    markdown_parser.list_stack = []
+    return markdown_parser._parse_text(text, True)
+
+
+def run_phases(markdown_parser, text):
+    # Seconds taken by each phase. Serializing changes the tree, so each
+    # target gets a tree of its own, and parse and r_node keep the
+    # fastest of their two runs.
+    timer = timeit.default_timer
+    times = {}
+    start = timer()
+    lex(markdown_parser, text)
+    times['lex'] = timer() - start
+    for target, serialize in SERIALIZERS:
+        start = timer()
+        tree = parse(markdown_parser, text)
+        parsed = timer()
+        markdown_parser.r_node(tree)
+        resolved = timer()
+        serialize(tree)
+        end = timer()
+        times['parse'] = min(times.get('parse', parsed - start),
+                             parsed - start)
+        times['r_node'] = min(times.get('r_node', resolved - parsed),
+                              resolved - parsed)
+        times[target] = end - resolved
+    return times
+
+
+def measure(markdown_parser, text, repeat):
+    # Microseconds per KB of each phase, the best of `repeat` runs
+    best = {}
+    for _ in range(repeat):
+        for phase, seconds in run_phases(markdown_parser, text).items():
+            best[phase] = min(best.get(phase, seconds), seconds)
+    kilobytes = len(text) / 1024.0
+    return dict((phase, best[phase] * 1e6 / kilobytes) for phase in PHASES)
+
+
+def compare(results, baseline, tolerance):
+    # Returns the (size, phase, ratio) of the phases slower than the
+    # baseline by more than `tolerance`
+    regressions = []
+    for size, phases in sorted(results.items(), key=lambda r: int(r[0])):
+        old = baseline.get(size)
+        if old is None:
+            continue
+        for phase in PHASES:
+            if phase not in old:
+                continue
+            ratio = phases[phase] / old[phase]
+            if ratio > 1 + tolerance:
+                regressions.append((size, phase, ratio))
+    return regressions
+
+
+def report(results, baseline):
+    print('%10s' % 'chars' + ''.join(['%12s' % phase for phase in PHASES]))
+    for size, phases in sorted(results.items(), key=lambda r: int(r[0])):
+        print('%10s' % size +
+              ''.join(['%12.1f' % phases[phase] for phase in PHASES]))
+        old = (baseline or {}).get(size)
+        if old:
+            print('%10s' % 'vs base' +
+                  ''.join(['%11.2fx' % (phases[phase] / old[phase])
+                           if phase in old else '%12s' % '-'
+                           for phase in PHASES]))
+    print('(microseconds per KB of Markdown)')
+    print()
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument('--sizes', default='10000,100000,400000',
+                      help='comma separated document sizes, in characters')
+    args.add_argument('--mix', default='',
+                      help='comma separated construct=weight, changing the '
+                      'default mix of corpus.py')
+    args.add_argument('--seed', type=int, default=0)
+    args.add_argument('--repeat', type=int, default=5)
+    args.add_argument('--save', metavar='FILE',
+                      help='write the results to FILE')
+    args.add_argument('--baseline', metavar='FILE',
+                      help='compare with results saved by --save')
+    args.add_argument('--tolerance', type=float, default=0.25,
+                      help='fail when a phase is slower than the baseline '
+                      'by more than this fraction')
+    options = args.parse_args(argv)
+    sizes = [int(size) for size in options.sizes.split(',')]
+    try:
+        mix = corpus.parse_mix(options.mix)
+    except ValueError as e:
+        args.error(str(e))
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as f:
+            saved = json.load(f)
+        if saved['mix'] != mix or saved['seed'] != options.seed:
+            args.error('%s was saved with another mix or seed' %
+                       options.baseline)
+        baseline = saved['results']
+
+    # Time Pygments, not the lookups of the snippets it already rendered
+    highlight.set_cache(None)
+    markdown_parser = MarkdownParser()
+    results = {}
+    for size in sizes:
+        text = corpus.generate(size, mix, options.seed)
+        results[str(size)] = measure(markdown_parser, text, options.repeat)
+    report(results, baseline)
+
+    if options.save:
+        with open(options.save, 'w') as f:
+            json.dump({'mix': mix, 'seed': options.seed, 'results': results},
+                      f, indent=1, sort_keys=True)
+            f.write('\n')
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, options.tolerance)
+    for size, phase, ratio in regressions:
+        print('%s at %s chars is %.2fx slower than the baseline' % (
+            phase, size, ratio))
+    if regressions:
+        return 1
+    print('No phase is more than %d%% slower than the baseline' % (
+        options.tolerance * 100))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8; -*-
+"""Generate synthetic Markdown for the benchmarks.
+
+Documents are made of random blocks of every construct the lexer knows:
+headings, lists nested up to 4 levels, tables, fenced and indented code
+in several languages, links and reference links, blockquotes, figures
+and comments. How often each construct shows up is set by a mix of
+weights, and the same seed always gives the same document.
+
+    python benchmarks/corpus.py [--size 100000] [--mix table=5,comment=0]
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import sys
+
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do '
+         'eiusmod tempor incididunt ut labore et dolore magna aliqua enim '
+         'ad minim veniam quis nostrud exercitation ullamco laboris nisi '
+         'aliquip ex ea commodo consequat').split()
+
+LANGUAGES = ('python', 'c', 'javascript', 'obj-c', 'git', 'git-out', '')
+
+CODE = {
+    'python': 'def f(x):\n    return x * %d\n',
+    'c': 'int f(int x) {\n    return x * %d;\n}\n',
+    'javascript': 'function f(x) {\n    return x * %d;\n}\n',
+    'obj-c': '- (int)f:(int)x {\n    return x * %d;\n}\n',
+    'git': 'git commit -m "change %d"\ngit push origin master\n',
+    'git-out': '[master 1a2b3c4] change %d\n 1 file changed\n',
+    '': 'plain text %d\nmore text\n',
+}
+
+# Every document defines these, so reference links can use any of them
+REF_KEYS = ['ref%d' % n for n in range(10)]
+
+
+def words(rng, count):
+    return ' '.join([rng.choice(WORDS) for _ in range(count)])
+
+
+def phrase(rng, references=True):
+    # Plain words with inline markup sprinkled in
+    kind = rng.randrange(8)
+    if kind == 0:
+        return '*%s*' % words(rng, 2)
+    if kind == 1:
+        return '**%s**' % words(rng, 2)
+    if kind == 2:
+        return '***%s***' % words(rng, 2)
+    if kind == 3:
+        return '`%s()`' % rng.choice(WORDS)
+    if kind == 4:
+        return '[%s](http://example.com/%s)' % (words(rng, 2),
+                                                rng.choice(WORDS))
+    if kind == 5 and references:
+        return '[%s][%s]' % (words(rng, 2), rng.choice(REF_KEYS))
+    return words(rng, rng.randint(3, 8))
+
+
+def line(rng, references=True):
+    # Reference links are only resolved in paragraphs and headings, the
+    # urls of the ones in lists and blockquotes are never filled in
+    return ' '.join([phrase(rng, references)
+                     for _ in range(rng.randint(2, 5))])
+
+
+def heading(rng):
+    return '%s %s\n\n' % ('#' * rng.randint(1, 6), words(rng, 4))
+
+
+def subheading(rng):
+    title = words(rng, 3)
+    return '%s\n%s\n\n' % (title, rng.choice('=-') * len(title))
+
+
+def paragraph(rng):
+    return '\n'.join([line(rng) for _ in range(rng.randint(1, 4))]) + '\n\n'
+
+
+def ulist(rng):
+    items = []
+    level = 0
+    for _ in range(rng.randint(2, 8)):
+        items.append('%s* %s\n' % ('  ' * level, line(rng, False)))
+        level = rng.randint(0, min(level + 1, 3))
+    return ''.join(items) + '\n'
+
+
+def olist(rng):
+    items = []
+    level = 0
+    numbers = [0] * 4
+    for _ in range(rng.randint(2, 8)):
+        numbers[level] += 1
+        items.append('%s%d. %s\n' % ('\t' * level, numbers[level],
+                                     line(rng, False)))
+        level = rng.randint(0, min(level + 1, 3))
+        numbers[level + 1:] = [0] * (3 - level)
+    return ''.join(items) + '\n'
+
+
+def table(rng):
+    columns = rng.randint(2, 5)
+
+    def row():
+        return '|'.join([words(rng, rng.randint(1, 2))
+                         for _ in range(columns)]) + '\n'
+    return (row() + '|'.join(['-'] * columns) + '\n' +
+            ''.join([row() for _ in range(rng.randint(1, 10))]) + '\n')
+
+
+def fenced_code(rng):
+    language = rng.choice(LANGUAGES)
+    # ~~~ fences are left out: whatever the opening fence, a block only
+    # closes at the next ```
+    return '```%s\n%s```\n\n' % (language,
+                                  CODE[language] % rng.randrange(100))
+
+
+def indented_code(rng):
+    language = rng.choice(LANGUAGES)
+    code = CODE[language] % rng.randrange(100)
+    if language:
+        code = ':::%s\n%s' % (language, code)
+    return ''.join(['\t%s\n' % text for text in code.splitlines()]) + '\n'
+
+
+def blockquote(rng):
+    return ''.join(['> %s\n' % line(rng, False)
+                    for _ in range(rng.randint(1, 4))]) + '\n'
+
+
+def figure(rng):
+    return '![%s](http://example.com/%s.png)\n\n' % (words(rng, 3),
+                                                    rng.choice(WORDS))
+
+
+def comment(rng):
+    return '<!-- %s -->\n\n' % words(rng, 6)
+
+
+CONSTRUCTS = {
+    'heading': heading,
+    'subheading': subheading,
+    'paragraph': paragraph,
+    'ulist': ulist,
+    'olist': olist,
+    'table': table,
+    'fenced_code': fenced_code,
+    'indented_code': indented_code,
+    'blockquote': blockquote,
+    'figure': figure,
+    'comment': comment,
+}
+
+# Roughly what our documentation pages look like
+DEFAULT_MIX = {
+    'heading': 4,
+    'subheading': 2,
+    'paragraph': 20,
+    'ulist': 5,
+    'olist': 3,
+    'table': 2,
+    'fenced_code': 3,
+    'indented_code': 2,
+    'blockquote': 2,
+    'figure': 1,
+    'comment': 1,
+}
+
+
+def parse_mix(spec):
+    # "table=5,comment=0" -> the default mix with those weights changed
+    mix = dict(DEFAULT_MIX)
+    for item in spec.split(','):
+        if not item:
+            continue
+        name, _, weight = item.partition('=')
+        if name not in CONSTRUCTS:
+            raise ValueError("Unknown construct %r" % (name,))
+        mix[name] = float(weight)
+    return mix
+
+
+def generate(size, mix=None, seed=0):
+    # Returns a document of about `size` characters
+    if mix is None:
+        mix = DEFAULT_MIX
+    names = sorted(name for name in mix if mix[name] > 0)
+    if not names:
+        raise ValueError("The mix has no construct with a positive weight")
+    total = float(sum(mix[name] for name in names))
+    cumulative = []
+    running = 0
+    for name in names:
+        running += mix[name] / total
+        cumulative.append(running)
+
+    rng = random.Random(seed)
+    # Starting with a paragraph keeps the first block from being lstripped
+    blocks = [paragraph(rng)]
+    length = len(blocks[0])
+    while length < size:
+        pick = rng.random()
+        index = 0
+        while index < len(names) - 1 and cumulative[index] < pick:
+            index += 1
+        block = CONSTRUCTS[names[index]](rng)
+        blocks.append(block)
+        length += len(block)
+    blocks.extend(['[%s]: http://example.com/%s\n' % (key, key)
+                   for key in REF_KEYS])
+    return ''.join(blocks)
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    args.add_argument('--size', type=int, default=100000,
+                      help='document size in characters')
+    args.add_argument('--mix', default='',
+                      help='comma separated construct=weight, changing the '
+                      'default mix (constructs: %s)' %
+                      ', '.join(sorted(CONSTRUCTS)))
+    args.add_argument('--seed', type=int, default=0)
+    options = args.parse_args(argv)
+    try:
+        mix = parse_mix(options.mix)
+    except ValueError as e:
+        args.error(str(e))
+    sys.stdout.write(generate(options.size, mix, options.seed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
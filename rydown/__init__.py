@@ -1,20 +1,22 @@
+import cache
 import parser
 import serializer
+from engine import Engine, EnginePool, get_engine
+from batch import convert_files, convert_many
+from cache import RenderCache, set_render_cache
+from incremental import IncrementalDocument
+from stats import RenderStats
+from tokens import Token, tokenize
 from ._version import get_versions
 
 
-def to_html(markdownContent):
-    p = parser.MarkdownParser()
-    tree = p.parse(markdownContent)
-    htmlContent = serializer.serialize(tree)
-    return htmlContent
+# `stats` is an optional RenderStats, telling where the time went
+def to_html(markdownContent, stats=None):
+    return cache.render(markdownContent, 'html', stats)
 
 
-def to_mediawiki(markdownContent):
-    p = parser.MarkdownParser()
-    tree = p.parse(markdownContent)
-    mediawikiContent = serializer.mediawiki_serialize(tree)
-    return mediawikiContent
+def to_mediawiki(markdownContent, stats=None):
+    return cache.render(markdownContent, 'mediawiki', stats)
 
 
 __version__ = get_versions()['version']
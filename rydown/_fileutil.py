@@ -0,0 +1,34 @@
+# -*- encoding: utf-8; -*-
+# Text, bytes and file writes shared by the caches and the rydown command
+import os
+import tempfile
+
+
+def to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
+
+
+def to_text(value):
+    # Only decode where str isn't bytes
+    if isinstance(value, str):
+        return value
+    return value.decode('utf-8')
+
+
+def write_atomic(path, value):
+    # Writes `value` (text is written as UTF-8) to `path`. Writes a
+    # temporary file next to it then renames it, so readers never see half
+    # a file. Errors are raised, the temporary file is removed.
+    data = to_bytes(value)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.rename(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
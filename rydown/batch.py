@@ -0,0 +1,75 @@
+import collections
+import multiprocessing
+
+from engine import get_engine
+from targets import get_target
+from _fileutil import to_text
+
+# One converted document. `source` is the Markdown text (convert_many) or
+# the path (convert_files) given, `index` its position in the input.
+# Exactly one of `output` and `error` is set: a failed document gets the
+# exception as "Type: message".
+Result = collections.namedtuple('Result', 'index source output error')
+
+
+def convert_many(sources, target='mediawiki', workers=None, ordered=True,
+                 chunksize=4):
+    # Converts many strings of Markdown and yields a Result for each.
+    #
+    # The documents are spread over `workers` processes (one per CPU by
+    # default) that each build their parser once. Results come in input
+    # order, or as soon as they are ready with ordered=False. A document
+    # that fails doesn't stop the others. With workers=1 everything runs
+    # in the calling process.
+    return _convert_all(sources, False, target, workers, ordered, chunksize)
+
+
+def convert_files(paths, target='mediawiki', workers=None, ordered=True,
+                  chunksize=4):
+    # Same as convert_many for the Markdown files at `paths`, read (as
+    # UTF-8) by the workers. A file that can't be read is a failed Result.
+    return _convert_all(paths, True, target, workers, ordered, chunksize)
+
+
+def _convert_all(sources, paths, target, workers, ordered, chunksize):
+    get_target(target)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers < 1:
+        raise ValueError("Need at least one worker")
+    jobs = ((index, source, paths, target)
+            for index, source in enumerate(sources))
+    if workers == 1:
+        return (_convert(job) for job in jobs)
+    return _convert_in_pool(jobs, workers, ordered, chunksize)
+
+
+def _convert_in_pool(jobs, workers, ordered, chunksize):
+    pool = multiprocessing.Pool(workers, initializer=get_engine)
+    try:
+        if ordered:
+            results = pool.imap(_convert, jobs, chunksize)
+        else:
+            results = pool.imap_unordered(_convert, jobs, chunksize)
+        for result in results:
+            yield result
+        pool.close()
+    finally:
+        # Also stops the workers when the caller stops iterating early
+        pool.terminate()
+        pool.join()
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return to_text(f.read())
+
+
+def _convert(job):
+    index, source, is_path, target = job
+    try:
+        text = _read(source) if is_path else source
+        output = get_engine().convert(text, target)
+    except Exception as e:
+        return Result(index, source, None, '%s: %s' % (type(e).__name__, e))
+    return Result(index, source, output, None)
@@ -0,0 +1,195 @@
+# -*- encoding: utf-8; -*-
+# Cache of whole rendered documents
+#
+# Pages that haven't changed are rendered again and again, so
+# rydown.to_html and rydown.to_mediawiki can look documents up in a
+# RenderCache first (see set_render_cache). Documents are keyed by a hash
+# of the Markdown, the output target and the rydown version, and cached
+# results are the exact strings the renderer returned.
+#
+# Where the results are kept is up to the backend: MemoryBackend (an LRU
+# bounded by size in bytes), DirectoryBackend (one file per document), or
+# any object with the methods of Backend, e.g. a wrapper around memcached.
+import collections
+import functools
+import hashlib
+import os
+import threading
+
+from engine import get_engine
+from _fileutil import to_bytes, to_text, write_atomic
+from targets import get_target
+from _version import get_versions
+
+
+class Backend(object):
+    # What RenderCache needs from a store. get returns None for unknown
+    # keys. Backends may forget anything at any time.
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def put(self, key, value):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        # Counters to report along with the cache's own, see RenderCache
+        return {}
+
+
+class MemoryBackend(Backend):
+    # Keeps documents in memory while their total size (UTF-8 bytes) is
+    # at most `max_bytes`, dropping the least recently used first.
+    # Documents bigger than that are never kept. Can be shared by threads.
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        if max_bytes < 1:
+            raise ValueError("Cache size must be at least 1 byte")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._entries[key] = entry
+            return entry[0]
+
+    def put(self, key, value):
+        size = len(to_bytes(value))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+                self.evicted_bytes += evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.size,
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes}
+
+
+class DirectoryBackend(Backend):
+    # Keeps each document in a file under `directory`, so they outlive the
+    # process and can be shared by processes. Nothing is ever evicted,
+    # clear() deletes the files.
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.out')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return to_text(f.read())
+        except (IOError, OSError):
+            return None
+
+    def put(self, key, value):
+        try:
+            write_atomic(self._path(key), value)
+        except (IOError, OSError):
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.out'):
+                os.remove(os.path.join(self.directory, name))
+
+
+class RenderCache(object):
+    # Looks rendered documents up in `backend` before rendering them.
+    # The key includes the rydown version, so an upgrade never serves
+    # old output; replacing serializer.html or serializer.mediawiki does
+    # not change the key, clear the cache after doing so.
+
+    def __init__(self, backend=None, version=None):
+        if backend is None:
+            backend = MemoryBackend()
+        if version is None:
+            version = get_versions()['version']
+        self.backend = backend
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, text, target):
+        digest = hashlib.sha1()
+        for part in (self.version, target, text):
+            digest.update(to_bytes(part))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def render(self, text, target, convert):
+        # Returns convert(text), from the backend when it has it
+        key = self.key(text, target)
+        rendered = self.backend.get(key)
+        with self._lock:
+            if rendered is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if rendered is None:
+            rendered = convert(text)
+            self.backend.put(key, rendered)
+        return rendered
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        stats = {'hits': self.hits, 'misses': self.misses}
+        stats.update(self.backend.stats())
+        return stats
+
+
+# Cache used by rydown.to_html and rydown.to_mediawiki, None (the default)
+# renders every time
+render_cache = None
+
+
+def set_render_cache(new_cache):
+    global render_cache
+    render_cache = new_cache
+
+
+def render(text, target, stats=None):
+    # Unknown targets raise before anything is looked up
+    get_target(target)
+    convert = functools.partial(get_engine().convert, target=target,
+                                stats=stats)
+    if render_cache is None:
+        return convert(text)
+    return render_cache.render(text, target, convert)
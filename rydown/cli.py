@@ -0,0 +1,169 @@
+# -*- encoding: utf-8; -*-
+# The rydown command
+#
+#     rydown [-t html|mediawiki] [-o OUTDIR] [-j N] FILE_OR_DIR...
+#
+# Converts Markdown files, and every .md/.markdown file under the given
+# directories, writing each output next to its source or under OUTDIR.
+# A manifest remembers the hash of every converted source (with the
+# target and rydown version), so files that haven't changed since the
+# last run are skipped.
+from __future__ import print_function
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from batch import convert_files
+from targets import TARGETS
+from _fileutil import to_bytes, write_atomic
+from _version import get_versions
+
+EXTENSIONS = ('.md', '.markdown')
+MANIFEST = '.rydown-manifest.json'
+
+
+def find_sources(inputs):
+    # Yields (source, path relative to its input) for every file given
+    # and every Markdown file under the directories given
+    for name in inputs:
+        if not os.path.isdir(name):
+            yield name, os.path.basename(name)
+            continue
+        for root, dirs, files in os.walk(name):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.endswith(EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    yield path, os.path.relpath(path, name)
+
+
+def output_path(source, relative, target, outdir):
+    base = os.path.splitext(relative if outdir else source)[0]
+    path = base + TARGETS[target].extension
+    if outdir:
+        path = os.path.join(outdir, path)
+    return path
+
+
+def digest(path, target, version):
+    sha = hashlib.sha1()
+    sha.update(('%s\0%s\0' % (version, target)).encode('utf-8'))
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        # Missing or unreadable, everything gets converted
+        return {}
+
+
+def save_manifest(path, manifest):
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    # An interrupted run never leaves half a manifest
+    write_atomic(path, json.dumps(manifest, indent=0, sort_keys=True))
+
+
+def write_output(path, text):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'wb') as f:
+        f.write(to_bytes(text))
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(
+        prog='rydown',
+        description='Convert Markdown files to HTML or MediaWiki markup.')
+    args.add_argument('inputs', nargs='+', metavar='FILE_OR_DIR')
+    args.add_argument('-t', '--target', choices=sorted(TARGETS),
+                      default='mediawiki')
+    args.add_argument('-o', '--output', metavar='DIR',
+                      help='write the outputs under DIR (default: next to '
+                      'each source)')
+    args.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                      help='number of worker processes')
+    args.add_argument('--manifest', metavar='FILE',
+                      help='hashes of the sources converted by previous '
+                      'runs (default: %s in the output directory, or in '
+                      'the current one)' % MANIFEST)
+    args.add_argument('-f', '--force', action='store_true',
+                      help='convert every file, even the unchanged ones')
+    options = args.parse_args(argv)
+    if options.jobs < 1:
+        args.error('-j needs at least one worker')
+
+    manifest_path = options.manifest or os.path.join(options.output or '.',
+                                                     MANIFEST)
+    manifest = {} if options.force else load_manifest(manifest_path)
+    version = get_versions()['version']
+
+    # Sources that would be written to the same file (a/x.md and b/x.md
+    # under -o, or x.md next to x.markdown) would overwrite each other,
+    # convert nothing rather than lose one of them
+    sources = []
+    written = {}
+    collisions = 0
+    for source, relative in find_sources(options.inputs):
+        output = output_path(source, relative, options.target,
+                             options.output)
+        other = written.setdefault(os.path.abspath(output), source)
+        if other is source:
+            sources.append((source, output))
+        elif os.path.abspath(other) != os.path.abspath(source):
+            print('%s: would overwrite the output of %s, %s' % (
+                source, other, output), file=sys.stderr)
+            collisions += 1
+    if collisions:
+        return 1
+
+    outputs = {}
+    hashes = {}
+    skipped = unreadable = 0
+    for source, output in sources:
+        try:
+            hashes[source] = digest(source, options.target, version)
+        except (IOError, OSError) as e:
+            print('%s: %s' % (source, e), file=sys.stderr)
+            unreadable += 1
+            continue
+        if (manifest.get(os.path.abspath(output)) == hashes[source] and
+                os.path.exists(output)):
+            skipped += 1
+            continue
+        outputs[source] = output
+
+    converted = failed = 0
+    results = convert_files(sorted(outputs), target=options.target,
+                            workers=options.jobs, ordered=False)
+    for result in results:
+        output = outputs[result.source]
+        if result.error is not None:
+            failed += 1
+            manifest.pop(os.path.abspath(output), None)
+            print('%s: %s' % (result.source, result.error), file=sys.stderr)
+            continue
+        write_output(output, result.output)
+        manifest[os.path.abspath(output)] = hashes[result.source]
+        converted += 1
+
+    if converted or failed:
+        save_manifest(manifest_path, manifest)
+    print('%d converted, %d unchanged, %d failed' % (
+        converted, skipped, failed + unreadable), file=sys.stderr)
+    return 1 if failed or unreadable else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
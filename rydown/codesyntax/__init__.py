@@ -0,0 +1,73 @@
+# Registry of the lexers used to highlight code blocks
+#
+# Lexers are looked up by alias: our own lexers first, then the ones
+# Pygments knows. Each lexer is built once, on first use, and Pygments
+# lookups are remembered, including the names it doesn't know.
+import threading
+
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+
+from .RysObjectiveCLexer import RysObjectiveCLexer
+from .RysGitLexer import RysGitLexer
+from .RysGitOutputLexer import RysGitOutputLexer
+
+# alias -> callable building the lexer
+_factories = {
+    'obj-c': RysObjectiveCLexer,
+    'git': RysGitLexer,
+    'git-out': RysGitOutputLexer,
+}
+# alias -> lexer, or None when Pygments doesn't know the alias
+_lexers = {}
+# alias -> how many times it was registered, see lexer_identity
+_generations = {}
+_lock = threading.Lock()
+
+
+def register_lexer(alias, factory):
+    # `factory` is a lexer class or any callable returning a lexer. The
+    # lexer is built again on next use, and as its identity changes,
+    # snippets the old one highlighted are not found in the highlight
+    # cache any more.
+    with _lock:
+        _factories[alias] = factory
+        _generations[alias] = _generations.get(alias, 0) + 1
+        # Also forgets that Pygments didn't know the alias
+        _lexers.pop(alias, None)
+
+
+def get_lexer(language):
+    try:
+        lexer = _lexers[language]
+    except KeyError:
+        with _lock:
+            if language not in _lexers:
+                _lexers[language] = _build(language)
+            lexer = _lexers[language]
+    if lexer is None:
+        raise ClassNotFound('no lexer for alias %r found' % language)
+    return lexer
+
+
+def lexer_identity(language):
+    # What tells the lexer of `language` from any other, for cache keys:
+    # its class, its options and how many times the alias was registered
+    # in this process. None when there is no lexer for it.
+    try:
+        lexer = get_lexer(language)
+    except ClassNotFound:
+        return None
+    cls = type(lexer)
+    return '%s.%s %r #%d' % (cls.__module__, cls.__name__,
+                             sorted(lexer.options.items()),
+                             _generations.get(language, 0))
+
+
+def _build(language):
+    if language in _factories:
+        return _factories[language]()
+    try:
+        return get_lexer_by_name(language)
+    except ClassNotFound:
+        return None
@@ -0,0 +1,117 @@
+import contextlib
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import parser
+from targets import get_target
+
+
+class Engine(object):
+    # Builds the PLY lexer and LALR tables once and reuses them for every
+    # document. MarkdownParser.parse resets the per-document state.
+    #
+    # An engine keeps that state on itself, so it must only be used by one
+    # thread at a time. Use get_engine() or an EnginePool to share work
+    # between threads.
+
+    def __init__(self):
+        # PLY writes its table files while building, don't let two threads
+        # do that at the same time
+        with _build_lock:
+            self.parser = parser.MarkdownParser()
+
+    def parse(self, markdownContent, stats=None):
+        return self.parser.parse(markdownContent, stats)
+
+    def parse_iter(self, source):
+        return self.parser.parse_iter(source)
+
+    # Renders with the serializer of `target`, see targets.py. `stats` is
+    # an optional stats.RenderStats timing each phase.
+    def convert(self, markdownContent, target, stats=None):
+        serialize = get_target(target).serialize
+        if stats is None:
+            return serialize(self.parse(markdownContent))
+        with stats.timing('total'):
+            tree = self.parse(markdownContent, stats)
+            return serialize(tree, stats)
+
+    def to_html(self, markdownContent, stats=None):
+        return self.convert(markdownContent, 'html', stats)
+
+    def to_mediawiki(self, markdownContent, stats=None):
+        return self.convert(markdownContent, 'mediawiki', stats)
+
+
+class EnginePool(object):
+    # Hands out engines that are never used by two threads at once.
+    # Engines are built on first demand (or all at once with prebuild) and
+    # at most `size` of them exist; checkout() blocks while all are busy.
+    # With size=None the pool grows to the peak number of checkouts.
+
+    def __init__(self, size=None, prebuild=False):
+        if size is not None and size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._built = 0
+        if prebuild and size is not None:
+            for _ in range(size):
+                self._built += 1
+                self._idle.put(Engine())
+
+    @contextlib.contextmanager
+    def checkout(self):
+        engine = self._acquire()
+        try:
+            yield engine
+        finally:
+            self._idle.put(engine)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            build = self.size is None or self._built < self.size
+            if build:
+                self._built += 1
+        if not build:
+            return self._idle.get()
+        try:
+            return Engine()
+        except Exception:
+            with self._lock:
+                self._built -= 1
+            raise
+
+    def convert(self, markdownContent, target, stats=None):
+        with self.checkout() as engine:
+            return engine.convert(markdownContent, target, stats)
+
+    def to_html(self, markdownContent, stats=None):
+        with self.checkout() as engine:
+            return engine.to_html(markdownContent, stats)
+
+    def to_mediawiki(self, markdownContent, stats=None):
+        with self.checkout() as engine:
+            return engine.to_mediawiki(markdownContent, stats)
+
+
+_build_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_engine():
+    # Engine of the calling thread, used by rydown.to_html and
+    # rydown.to_mediawiki. Each thread gets its own, so the module level
+    # helpers are safe to call concurrently.
+    engine = getattr(_local, 'engine', None)
+    if engine is None:
+        engine = _local.engine = Engine()
+    return engine
@@ -0,0 +1,165 @@
+# -*- encoding: utf-8; -*-
+# Pygments highlighting of block_code nodes
+#
+# The same snippets (install commands, boilerplate...) show up on many
+# pages, so rendered snippets are kept in a bounded LRU cache keyed by
+# language, code and output flavour. The cache can also keep them in a
+# directory so later builds don't run Pygments for unchanged snippets.
+import collections
+import hashlib
+import os
+import threading
+
+import pygments
+from pygments.formatters import HtmlFormatter
+from pygments import highlight
+
+from codesyntax import get_lexer, lexer_identity
+from _fileutil import to_bytes, to_text, write_atomic
+from _version import get_versions
+
+HTML = 'html'
+MEDIAWIKI = 'mediawiki'
+
+
+def render(code, language, flavour):
+    # Cached version of render_uncached
+    if cache is None:
+        return render_uncached(code, language, flavour)
+    key = cache.key(code, language, flavour)
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = render_uncached(code, language, flavour)
+        cache.put(key, rendered)
+    return rendered
+
+
+def render_uncached(code, language, flavour):
+    # Convert tabs to spaces
+    content = code.replace('\t', '    ')
+    # Use Pygments to highlight the code block
+    formatter = HtmlFormatter(encoding='utf-8')
+    # The formatter encodes its output
+    rendered = to_text(highlight(content, get_lexer(language), formatter))
+    rendered = rendered.replace('<div class="highlight"><pre>', '<pre>')
+    rendered = rendered.replace('</pre></div>', '</pre>')
+    if flavour == HTML:
+        rendered = rendered.replace('<span', '<code')
+        rendered = rendered.replace('</span>', '</code>')
+    elif flavour == MEDIAWIKI:
+        rendered = rendered.replace('<span>', '')
+        rendered = rendered.replace('</span>', '')
+    else:
+        raise ValueError("Unknown flavour %r" % flavour)
+    return rendered
+
+
+_versions = []
+
+
+def _default_version():
+    # Looked up on first use, it can take a while (see _version.py)
+    if not _versions:
+        _versions.append('rydown %s pygments %s' % (
+            get_versions()['version'], pygments.__version__))
+    return _versions[0]
+
+
+class HighlightCache(object):
+    # Keeps up to `maxsize` rendered snippets in memory, dropping the least
+    # recently used first. With a `directory`, snippets are also written
+    # there (one file per snippet) and read back on a memory miss.
+    # A cache can be shared by threads.
+    #
+    # Keys include the rydown and Pygments versions (or `version`) and the
+    # lexer used, so a directory never serves snippets rendered by an
+    # older release or by a lexer that was since registered again.
+
+    def __init__(self, maxsize=256, directory=None, version=None):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.maxsize = maxsize
+        self.directory = directory
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, code, language, flavour):
+        digest = hashlib.sha1()
+        lexer = lexer_identity(language) or ''
+        version = self.version or _default_version()
+        for part in (version, lexer, flavour, language, code):
+            digest.update(to_bytes(part))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            rendered = self._entries.pop(key, None)
+            if rendered is not None:
+                self._entries[key] = rendered
+                self.hits += 1
+                return rendered
+        rendered = self._read(key)
+        with self._lock:
+            if rendered is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(key, rendered)
+        return rendered
+
+    def put(self, key, rendered):
+        with self._lock:
+            self._remember(key, rendered)
+        self._write(key, rendered)
+
+    def clear(self):
+        # Only forgets what is in memory, the directory is left alone
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, key, rendered):
+        self._entries.pop(key, None)
+        self._entries[key] = rendered
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.html')
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return to_text(f.read())
+        except (IOError, OSError):
+            return None
+
+    def _write(self, key, rendered):
+        if self.directory is None:
+            return
+        try:
+            write_atomic(self._path(key), rendered)
+        except (IOError, OSError):
+            pass
+
+
+# Cache used by the serializer, replace it (or set it to None to disable
+# caching) with set_cache
+cache = HighlightCache()
+
+
+def set_cache(new_cache):
+    global cache
+    cache = new_cache
@@ -0,0 +1,93 @@
+# -*- encoding: utf-8; -*-
+# Incremental rendering of a document being edited
+#
+# The source is cut into pieces at blank lines (see parser.split_blocks),
+# and each piece is parsed and rendered on its own, like parse_iter does.
+# A piece's output only depends on its text and on the urls its
+# reference links point to, so after an edit only the pieces whose text
+# changed, or whose references were (re)defined elsewhere, are parsed and
+# rendered again.
+from engine import get_engine
+from targets import get_target
+import parser
+
+
+class _Piece(object):
+    __slots__ = ('blocks', 'definitions', 'keys', 'urls', 'output')
+
+    def __init__(self, blocks, definitions, keys):
+        self.blocks = blocks
+        # (key, url) of the reference definitions
+        self.definitions = definitions
+        # Keys of the references used, and the urls they were rendered with
+        self.keys = keys
+        self.urls = None
+        self.output = None
+
+
+class IncrementalDocument(object):
+    # Call update() with the whole source after each edit, it returns the
+    # rendered document. The output is the same as rendering the blocks of
+    # parse_iter(source) one after the other.
+    #
+    # After each update, `parsed` and `reused` tell how many pieces were
+    # parsed and rendered again, and how many were kept as they were.
+
+    def __init__(self, target='mediawiki', engine=None):
+        get_target(target)
+        self.target = target
+        self.engine = engine
+        self.source = None
+        self.output = ''
+        self.parsed = 0
+        self.reused = 0
+        # Pieces by (text, whether it is the first one)
+        self._pieces = {}
+
+    def update(self, source):
+        markdown_parser = (self.engine or get_engine()).parser
+        render = get_target(self.target).serialize
+        texts = list(parser.split_blocks([source]))
+        pieces = {}
+        order = []
+        self.parsed = self.reused = 0
+        for index, text in enumerate(texts):
+            key = (text, index == 0)
+            piece = pieces.get(key) or self._pieces.get(key)
+            if piece is None:
+                piece = self._parse(markdown_parser, text, index == 0)
+            pieces[key] = piece
+            order.append(key)
+
+        # Later definitions of a key win, like in a whole document
+        table = {}
+        for key in order:
+            table.update(pieces[key].definitions)
+
+        for key in set(order):
+            piece = pieces[key]
+            urls = [table.get(k) for k in piece.keys]
+            if piece.output is not None and piece.urls == urls:
+                self.reused += 1
+                continue
+            if piece.output is not None:
+                # Its tree was resolved (and maybe changed by rendering)
+                # with other urls, start again from the text
+                piece = pieces[key] = self._parse(markdown_parser, *key)
+            # Raises KeyError for undefined references, just like parse()
+            for block in piece.blocks:
+                markdown_parser.r_node(block, table)
+            piece.urls = urls
+            piece.output = ''.join([render(block) for block in piece.blocks])
+            self.parsed += 1
+
+        self._pieces = pieces
+        self.source = source
+        self.output = ''.join([pieces[key].output for key in order])
+        return self.output
+
+    def _parse(self, markdown_parser, text, first):
+        blocks, definitions = markdown_parser.parse_block(text, first)
+        keys = sorted(set(k for block in blocks
+                          for k in markdown_parser.ref_link_keys(block)))
+        return _Piece(blocks, definitions, keys)
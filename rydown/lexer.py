@@ -2,17 +2,32 @@
 import re
 import textwrap
 import ply.lex as lex
+import tables
+
+_FENCE_RUN = re.compile(r'[`~]{3,}')
+_BRACKET = re.compile(r'[\[\]]')
+_SPACE = re.compile(r'\s')
 
 
 class MarkdownLexer:
 
     def __init__(self):
-        self.lexer = lex.lex(module=self, debug=False)
+        self._closers = {}
+        lextab = tables.load_lextab(self)
+        if lextab is not None:
+            # Master regexes were generated at build time
+            self.lexer = lex.lex(module=self, debug=False, optimize=1,
+                                 lextab=lextab)
+        else:
+            self.lexer = lex.lex(module=self, debug=False)
 
     def reset(self):
         # Call this before running the lexer a second time
         self.state = 'INITIAL'
+        # Drop states left pushed by an unterminated heading, link, etc.
+        self.lexer.lexstatestack = []
         self.lexer.begin('INITIAL')
+        self.lexer.lineno = 1
 
     state = 'INITIAL'
 
@@ -62,7 +77,7 @@ class MarkdownLexer:
         "ESCAPE_SEQUENCE",
     ]
 
-    t_PLAINTEXT = r'[^`*\n\t\\\[\]]+'
+    t_PLAINTEXT = r'[^`*\n\\\[\]]+'
     t_LINK_SPECIAL_CHARS = r'[\[\]]'
     t_REF_LINK_URL = r'\[[^\]\s]+\]\s*:\s*.+'
 
@@ -77,7 +92,7 @@ class MarkdownLexer:
         return t
 
     def t_heading_PLAINTEXT(self, t):
-        r'[^`*\n\t#\\\[\]]+(?=[^#])'
+        r'[^`*\n#\\\[\]]+(?=[^#])'
         # Need to disallow # in headings
         # Dunno why the [^#] works (for heading strip)
         return t
@@ -142,7 +157,7 @@ class MarkdownLexer:
         return t
 
     def t_ULIST_ITEM_START(self, t):
-        r'((\x81\x81|\x80\x80)*)([*+-][\t ]+)'
+        r'((\t|\ \ )*)([*+-][\t ]+)'
         # Change state to `list` if this is first item
         if self.state != 'list':
             self.state = 'list'
@@ -161,24 +176,47 @@ class MarkdownLexer:
         r'\t(.*\n\t)*(.+\n\n+)'
         # [start]     [line]+        [end]
         # If you want to allow empty lines: r'\t   (.+\n+\t)+   (.+\n\n(?!\t))'
+        # Only a tab starting a line starts code, one after inline markup
+        # ("**bold**\tthen") is text
+        if t.lexpos > 0 and t.lexer.lexdata[t.lexpos - 1] != '\n':
+            return self._fall_through(t)
         # Dedent the code block
         t.value = textwrap.dedent(t.value)
         return t
 
+    # Fenced code and comments only match their opening delimiter, the
+    # closing one is found by _find_closer in linear time. Matching them in
+    # the regexes backtracks for ages when the closing delimiter is missing.
     def t_BLOCKERCODEONE(self, t):
-        r'[`~]{3}[^\n\`]((?!```).|(?!```)\n|)*[`~]{3}'
-        t.value = textwrap.dedent(t.value)
+        r'[`~]{3}[^\n\`]'
+        # Used to be [`~]{3}[^\n\`]((?!```).|(?!```)\n|)*[`~]{3}
+        end = self._fence_end(t.lexpos + 4)
+        if end < 0:
+            return self.t_BLOCKERCODETWO(t)
+        t.value = textwrap.dedent(t.lexer.lexdata[t.lexpos:end])
+        t.lexer.lexpos = end
         return t
 
     def t_BLOCKERCODETWO(self, t):
-        r'[`~]{3}((?!```).|(?!```)\n|)*[`~]{3}'
-        t.value = textwrap.dedent('```text' + t.value[3:])
+        r'[`~]{3}'
+        # Used to be [`~]{3}((?!```).|(?!```)\n|)*[`~]{3}
+        end = self._fence_end(t.lexpos + 3)
+        if end < 0:
+            return self._fall_through(t)
+        t.type = 'BLOCKERCODETWO'
+        value = t.lexer.lexdata[t.lexpos:end]
+        t.value = textwrap.dedent('```text' + value[3:])
+        t.lexer.lexpos = end
         return t
 
-    # Fig regexs were (basically) copied from link tokens
+    # Fig regexs were (basically) copied from link tokens. The lookahead
+    # checking for the rest of the link is done by _bracket_followed_by,
+    # in a regex it rescanned the text at every bracket.
     def t_FIG_START(self, t):
-        r'!\[(?=([^\]\[]|\n)+\]\([^\s]+\))'
-        # Must make sure this isn't too greedy
+        r'!\['
+        # Used to be !\[(?=([^\]\[]|\n)+\]\([^\s]+\))
+        if not self._bracket_followed_by(t.lexpos + 1, '(', ')'):
+            return self._fall_through(t)
         t.lexer.push_state('figure')
         return t
 
@@ -189,8 +227,10 @@ class MarkdownLexer:
         return t
 
     def t_LINK_START(self, t):
-        r'\[(?=([^\]\[]|\n)+\]\([^\s]+\))'
-        # Must make sure this isn't too greedy
+        r'\['
+        # Used to be \[(?=([^\]\[]|\n)+\]\([^\s]+\))
+        if not self._bracket_followed_by(t.lexpos, '(', ')'):
+            return self.t_REF_LINK_START(t)
         t.lexer.push_state('link')
         return t
 
@@ -201,7 +241,11 @@ class MarkdownLexer:
         return t
 
     def t_REF_LINK_START(self, t):
-        r'\[(?=([^\]\[]|\n)+\]\[[^\s]+\])'
+        r'\['
+        # Used to be \[(?=([^\]\[]|\n)+\]\[[^\s]+\])
+        if not self._bracket_followed_by(t.lexpos, '[', ']'):
+            return self._fall_through(t)
+        t.type = 'REF_LINK_START'
         t.lexer.push_state('reflink')
         return t
 
@@ -226,16 +270,24 @@ class MarkdownLexer:
         return t
 
     def t_COMMENT(self, t):
-        r'<!?--(?:(?!-->)(.|\n|\s))*-->\n*'
-        pass
+        r'<!?--'
+        # Used to be <!?--(?:(?!-->)(.|\n|\s))*-->\n*
+        end = self._find_closer('-->', t.lexer.lexpos)
+        if end < 0:
+            return self._fall_through(t)
+        data = t.lexer.lexdata
+        end += 3
+        while data.startswith('\n', end):
+            end += 1
+        t.lexer.lexpos = end
 
     def t_MULTIPLE_NEWLINES(self, t):
         r'\n{2,}|\n$'
         # Since the header is never poped if we don't
         #  have end special character we do it ourselves
-        if t.lexer.current_state() in ['heading', 'table']:
+        if t.lexer.current_state() == 'heading':
             t.lexer.pop_state()
-        elif t.lexer.current_state() == 'list':
+        elif t.lexer.current_state() in ['table', 'list']:
             self.state = 'INITIAL'
             t.lexer.pop_state()
         t.lexer.lineno += len(t.value)
@@ -250,6 +302,84 @@ class MarkdownLexer:
         t.lexer.lineno += 1
         return t
 
+    def _fence_end(self, start):
+        # Where a fence opened before `start` ends: greedily, just after the
+        # first ``` or, without one, after the last run of three [`~]
+        end = self._find_closer('```', start)
+        if end >= 0:
+            return end + 3
+        data = self.lexer.lexdata
+        cached = self._closers.get('run')
+        if cached is None or cached[0] is not data:
+            last = -1
+            for m in _FENCE_RUN.finditer(data):
+                last = m.end() - 3
+            cached = self._closers['run'] = (data, last)
+        if cached[1] >= start:
+            return cached[1] + 3
+        return -1
+
+    def _bracket_followed_by(self, start, opener, closer):
+        # Whether the [ at `start` is closed by the next bracket, with text
+        # in between, and that is followed by `opener` and non-space text
+        # ending with `closer`: [text](url) or [text][key]
+        data = self.lexer.lexdata
+        end = self._find_closer(_BRACKET, start + 1)
+        if end <= start + 1 or data[end] != ']':
+            return False
+        if not data.startswith(opener, end + 1):
+            return False
+        found = self._find_closer(closer, end + 3)
+        if found < 0:
+            return False
+        space = self._find_closer(_SPACE, end + 2)
+        return space < 0 or space > found
+
+    def _find_closer(self, closer, start):
+        # Position of the first `closer` (a string or a regex) at or after
+        # `start`, or -1. Lexing only moves forward, so a result is reused
+        # until lexing gets past it and the input is searched about once
+        # per kind of closer.
+        data = self.lexer.lexdata
+        cached = self._closers.get(closer)
+        if (cached is not None and cached[0] is data and
+                cached[1] <= start and (cached[2] < 0 or start <= cached[2])):
+            return cached[2]
+        if isinstance(closer, str):
+            found = data.find(closer, start)
+        else:
+            m = closer.search(data, start)
+            found = -1 if m is None else m.start()
+        self._closers[closer] = (data, start, found)
+        return found
+
+    def _fall_through(self, t):
+        # When a rule matched only the opening delimiter but the rest is
+        # missing, do what the rules after it would have done
+        data = t.lexer.lexdata
+        t.lexer.lexpos = t.lexpos
+        for token_type, regex in _FALL_THROUGH:
+            m = regex.match(data, t.lexpos)
+            if m is not None:
+                t.type = token_type
+                t.value = m.group()
+                t.lexer.lexpos = m.end()
+                if token_type == 'INLINE_CODE':
+                    return self.t_INLINE_CODE(t)
+                return t
+        t.value = data[t.lexpos:]
+        self.t_error(t)
+
     def t_error(self, t):
         print("Illegal character '%s'" % t.value[0])
         t.lexer.skip(1)
+
+
+# The rules tried after fenced code, links and comments that can match
+# the same first character, in the order PLY tries them
+_FALL_THROUGH = [
+    ('INLINE_CODE', re.compile(MarkdownLexer.t_INLINE_CODE.__doc__)),
+    ('REF_LINK_URL', re.compile(MarkdownLexer.t_REF_LINK_URL)),
+    ('PLAINTEXT', re.compile(MarkdownLexer.t_PLAINTEXT)),
+    ('LINK_SPECIAL_CHARS', re.compile(MarkdownLexer.t_LINK_SPECIAL_CHARS)),
+]
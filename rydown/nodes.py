@@ -0,0 +1,310 @@
+# -*- encoding: utf-8; -*-
+# Typed parse tree
+#
+# MarkdownParser(typed_nodes=True) builds these instead of the nested lists
+# ['paragraph', [['text', 'x'], ...]]. Each node type is a class with
+# __slots__ and an integer `kind`, so nodes take less memory and can be
+# dispatched on without comparing strings.
+#
+# Nodes can still be read like the old lists (node[0] is the type name,
+# node[1] the first field...), so code written for lists keeps working,
+# and to_legacy() converts a tree to lists.
+
+NAMES = (
+    'document',
+    'heading',
+    'subheading',
+    'horizontalline',
+    'paragraph',
+    'figure',
+    'table_head',
+    'table_body',
+    'block_code',
+    'blocker_code',
+    'blockquote',
+    'emphasisstrong',
+    'emphasis',
+    'strong',
+    'inline_code',
+    'link',
+    'ref_link',
+    'ref_link_url',
+    'text',
+    'olist',
+    'ulist',
+    'list_item',
+    'list_uitem',
+)
+
+(DOCUMENT, HEADING, SUBHEADING, HORIZONTALLINE, PARAGRAPH, FIGURE,
+ TABLE_HEAD, TABLE_BODY, BLOCK_CODE, BLOCKER_CODE, BLOCKQUOTE,
+ EMPHASISSTRONG, EMPHASIS, STRONG, INLINE_CODE, LINK, REF_LINK,
+ REF_LINK_URL, TEXT, OLIST, ULIST, LIST_ITEM, LIST_UITEM) = range(len(NAMES))
+
+KINDS = dict((name, kind) for kind, name in enumerate(NAMES))
+
+
+class Node(object):
+    __slots__ = ()
+    kind = None
+    # Field names in the order of the old list layout
+    fields = ()
+
+    @property
+    def name(self):
+        return NAMES[self.kind]
+
+    def _values(self):
+        values = [getattr(self, field) for field in self.fields]
+        # Optional trailing fields are left out of the old lists
+        while values and values[-1] is None:
+            values.pop()
+        return values
+
+    def __getitem__(self, index):
+        # Reads the one field asked for, without building the old list
+        if index == 0:
+            return NAMES[self.kind]
+        if type(index) is int and index > 0:
+            fields = self.fields
+            if index <= len(fields):
+                value = getattr(self, fields[index - 1])
+                if value is not None:
+                    return value
+                # See _values, only trailing None fields are left out
+                for field in fields[index:]:
+                    if getattr(self, field) is not None:
+                        return None
+            raise IndexError('node index out of range')
+        # Negative indexes and slices
+        return ([NAMES[self.kind]] + self._values())[index]
+
+    def __iter__(self):
+        return iter([NAMES[self.kind]] + self._values())
+
+    def __len__(self):
+        return 1 + len(self._values())
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__,
+                           ', '.join(repr(v) for v in self._values()))
+
+    def to_legacy(self):
+        return [self.name] + [_legacy(value) for value in self._values()]
+
+
+def _legacy(value):
+    if isinstance(value, Node):
+        return value.to_legacy()
+    if isinstance(value, list):
+        return [_legacy(item) for item in value]
+    return value
+
+
+def to_legacy(node):
+    # Old list layout of a tree of typed nodes
+    return _legacy(node)
+
+
+class _Parent(Node):
+    __slots__ = ('children',)
+    fields = ('children',)
+
+    def __init__(self, children):
+        self.children = children
+
+
+class _Value(Node):
+    __slots__ = ('value',)
+    fields = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class _Code(Node):
+    __slots__ = ('code', 'language')
+    fields = ('code', 'language')
+
+    def __init__(self, code, language):
+        self.code = code
+        self.language = language
+
+
+class _Target(Node):
+    __slots__ = ('children', 'url')
+    fields = ('children', 'url')
+
+    def __init__(self, children, url):
+        self.children = children
+        self.url = url
+
+
+class Document(_Parent):
+    __slots__ = ()
+    kind = DOCUMENT
+
+
+class Heading(Node):
+    __slots__ = ('children', 'level')
+    kind = HEADING
+    fields = ('children', 'level')
+
+    def __init__(self, children, level):
+        self.children = children
+        self.level = level
+
+
+class Subheading(_Parent):
+    __slots__ = ()
+    kind = SUBHEADING
+
+
+class HorizontalLine(Node):
+    __slots__ = ()
+    kind = HORIZONTALLINE
+
+
+class Paragraph(_Parent):
+    __slots__ = ()
+    kind = PARAGRAPH
+
+
+class Figure(_Target):
+    __slots__ = ()
+    kind = FIGURE
+
+
+class TableHead(Node):
+    __slots__ = ('content', 'body')
+    kind = TABLE_HEAD
+    fields = ('content', 'body')
+
+    def __init__(self, content, body):
+        self.content = content
+        self.body = body
+
+
+class TableBody(Node):
+    __slots__ = ('rows',)
+    kind = TABLE_BODY
+    fields = ('rows',)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+
+class BlockCode(_Code):
+    __slots__ = ()
+    kind = BLOCK_CODE
+
+
+class BlockerCode(_Code):
+    __slots__ = ()
+    kind = BLOCKER_CODE
+
+
+class Blockquote(_Parent):
+    __slots__ = ()
+    kind = BLOCKQUOTE
+
+
+class EmphasisStrong(_Value):
+    __slots__ = ()
+    kind = EMPHASISSTRONG
+
+
+class Emphasis(_Value):
+    __slots__ = ()
+    kind = EMPHASIS
+
+
+class Strong(_Value):
+    __slots__ = ()
+    kind = STRONG
+
+
+class InlineCode(_Value):
+    __slots__ = ()
+    kind = INLINE_CODE
+
+
+class Link(_Target):
+    __slots__ = ()
+    kind = LINK
+
+
+class RefLink(Node):
+    # The url is filled in once the whole document has been parsed
+    __slots__ = ('children', 'key', 'url')
+    kind = REF_LINK
+    fields = ('children', 'key', 'url')
+
+    def __init__(self, children, key, url=None):
+        self.children = children
+        self.key = key
+        self.url = url
+
+
+class RefLinkUrl(Node):
+    __slots__ = ('key', 'url')
+    kind = REF_LINK_URL
+    fields = ('key', 'url')
+
+    def __init__(self, key, url):
+        self.key = key
+        self.url = url
+
+
+class Text(_Value):
+    __slots__ = ()
+    kind = TEXT
+
+
+class OList(_Parent):
+    __slots__ = ()
+    kind = OLIST
+
+
+class UList(_Parent):
+    __slots__ = ()
+    kind = ULIST
+
+
+class ListItem(_Parent):
+    __slots__ = ()
+    kind = LIST_ITEM
+
+
+class ListUItem(Node):
+    # The old lists keep the level at the end of the children
+    __slots__ = ('children', 'level')
+    kind = LIST_UITEM
+    fields = ('children',)
+
+    def __init__(self, children, level=None):
+        self.children = children
+        self.level = level
+
+    def _values(self):
+        if self.level is None:
+            return [self.children]
+        return [self.children + [self.level]]
+
+    def __getitem__(self, index):
+        if index == 1 and self.level is not None:
+            return self.children + [self.level]
+        return Node.__getitem__(self, index)
+
+    def to_legacy(self):
+        children = _legacy(self.children)
+        if self.level is not None:
+            children.append(self.level)
+        return [self.name, children]
+
+
+CLASSES = dict((cls.kind, cls) for cls in (
+    Document, Heading, Subheading, HorizontalLine, Paragraph, Figure,
+    TableHead, TableBody, BlockCode, BlockerCode, Blockquote,
+    EmphasisStrong, Emphasis, Strong, InlineCode, Link, RefLink, RefLinkUrl,
+    Text, OList, UList, ListItem, ListUItem))
@@ -1,6 +1,112 @@
 import re
+import timeit
+from collections import deque
 import ply.yacc as yacc
 from lexer import MarkdownLexer
+import nodes
+import tables
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+# Things that decide whether a blank line ends a block, see split_blocks
+_BLOCK_MARKERS = re.compile(r'```|~~~|<!?--|-->')
+_GLUED_TAIL = re.compile(r'(-->|\[[^\]\s]+\]\s*(:\s*)?)$')
+_LIST_ITEM = re.compile(r'[ \t]*([*+-][ \t]|\d+\.\s)')
+
+# Node types whose children MarkdownParser.r_node visits
+_R_NODE_CHILDREN = frozenset(['document', 'heading', 'paragraph',
+                              'list_item', 'list_uitem'])
+
+
+def _lstrip(text):
+    # Strips leading whitespace except indentation: tabs and runs of more
+    # than one space
+    start = 0
+    for start, c in enumerate(text):
+        if c == '\t' or not c.isspace():
+            break
+        if c == ' ' and text.startswith(' ', start + 1):
+            break
+    else:
+        return ''
+    return text[start:]
+
+
+def _list_node(name, *fields):
+    return [name] + list(fields)
+
+
+_CLASSES = dict((nodes.NAMES[kind], cls)
+                for kind, cls in nodes.CLASSES.items())
+
+
+def _typed_node(name, *fields):
+    return _CLASSES[name](*fields)
+
+
+def split_blocks(chunks):
+    # Cuts Markdown arriving in chunks of any size into pieces that end with
+    # blank lines. The lexer ends every block (and list) at a blank line, so
+    # the pieces can be parsed one after the other. Blank lines inside fenced
+    # code or comments, or swallowed by the token before them (a comment,
+    # a reference definition without its url yet), never end a piece,
+    # and neither do blank lines between two list items: the parser joins
+    # those into a single list.
+    fence = None
+    comment = False
+    can_end = False
+    can_split = False
+    in_list = False
+    lines = []
+    partial = []
+    for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find('\n', start)
+            if end < 0:
+                if start < len(chunk):
+                    partial.append(chunk[start:])
+                break
+            partial.append(chunk[start:end + 1])
+            line = ''.join(partial)
+            partial = []
+            start = end + 1
+
+            if line == '\n':
+                can_split = can_end
+                lines.append(line)
+                continue
+            is_item = _LIST_ITEM.match(line) is not None
+            if can_split and not (in_list and is_item):
+                yield ''.join(lines)
+                lines = []
+            if is_item:
+                in_list = True
+            elif can_split:
+                in_list = False
+            can_split = False
+            lines.append(line)
+            for marker in _BLOCK_MARKERS.findall(line):
+                if comment:
+                    comment = marker != '-->'
+                elif fence is not None:
+                    # A tilde fence is also closed by backticks
+                    if marker == '```' or marker == fence:
+                        fence = None
+                elif marker in ('```', '~~~'):
+                    fence = marker
+                elif marker != '-->':
+                    comment = True
+            can_end = (fence is None and not comment and
+                       not _GLUED_TAIL.search(line[:-1]))
+    if partial:
+        lines.append(''.join(partial))
+    if lines:
+        yield ''.join(lines)
+
 
 
 class MarkdownParser:
@@ -12,34 +118,122 @@ class MarkdownParser:
         ('left', 'BLOCK_CODE'),
     )
 
-    def __init__(self):
+    def __init__(self, typed_nodes=False):
+        # With typed_nodes the tree is made of rydown.nodes classes instead
+        # of nested lists, see nodes.py
+        self.typed_nodes = typed_nodes
+        self._node = _typed_node if typed_nodes else _list_node
         self.max_heading_level = 0
         self.ref_link_table = {}
         self.list_stack = []
         self.lexer = MarkdownLexer()
         self.tokens = self.lexer.tokens
-        self.parser = yacc.yacc(module=self, write_tables=1)
+        # Use the tables generated at build time if they match the grammar,
+        # otherwise build them in memory. Never write them at runtime.
+        self.parser = yacc.yacc(module=self,
+                                tabmodule=tables.load_parsetab() or
+                                tables.PARSETAB,
+                                write_tables=False, debug=False,
+                                errorlog=yacc.NullLogger())
+
+    def parse(self, text, stats=None):
+        # `stats` is an optional stats.RenderStats timing each phase
+        self.max_heading_level = 0
+        self.ref_link_table = {}
+        self.list_stack = []
+        tree = self._parse_text(text, True, stats)
+        if stats is None:
+            self.r_node(tree)
+        else:
+            with stats.timing('r_node'):
+                self.r_node(tree)
+        return tree
 
-    def parse(self, text):
+    def parse_iter(self, source):
+        # Parses a document given as a string, a file object or any iterable
+        # of chunks, and yields its top-level blocks as soon as they are
+        # complete, so the whole input never has to be in memory.
+        # Inline markup can't run across a blank line here, otherwise the
+        # blocks are the ones parse() returns. Blocks using a reference
+        # link that isn't defined yet are held back until it is.
+        if isinstance(source, string_types):
+            source = [source]
         self.max_heading_level = 0
         self.ref_link_table = {}
         self.list_stack = []
+        pending = deque()
+        first = True
+        for text in split_blocks(source):
+            blocks, definitions = self.parse_block(text, first)
+            first = False
+            self.ref_link_table.update(definitions)
+            for block in blocks:
+                pending.append((block, set(self.ref_link_keys(block))))
+            while pending and pending[0][1] <= set(self.ref_link_table):
+                block = pending.popleft()[0]
+                self.r_node(block)
+                yield block
+        # Raises KeyError for undefined references, just like parse()
+        for block, _ in pending:
+            self.r_node(block)
+            yield block
+
+    def parse_block(self, text, first=False):
+        # Parses one piece of a document as split_blocks cuts it (`first`
+        # for the one starting the document) without filling in reference
+        # links. Returns its top-level blocks and the (key, url) reference
+        # definitions it has. A piece with a syntax error has no blocks,
+        # p_error already reported it.
+        table = self.ref_link_table
+        self.ref_link_table = {}
+        try:
+            tree = self._parse_text(text, first)
+            definitions = list(self.ref_link_table.items())
+        finally:
+            self.ref_link_table = table
+        if tree is None:
+            return [], definitions
+        return tree[1], definitions
+
+    def ref_link_keys(self, node):
+        # Yields the key of every reference link under `node`
+        stack = [node]
+        while stack:
+            for child in stack.pop():
+                if isinstance(child, (list, nodes.Node)):
+                    if child and child[0] == 'ref_link':
+                        yield child[2]
+                    stack.append(child)
+
+    def _parse_text(self, text, lstrip, stats=None):
         # Reset the lexer state (this is very important!)
         self.lexer.reset()
-        # Replace for good indentation (HACK :\)
-        text = text.replace('  ', '\x80\x80')
-        text = text.replace('\t', '\x81\x81')
-        tree = self.parser.parse(text.lstrip(), debug=False)
-        self.r_node(tree)
+        if lstrip:
+            text = _lstrip(text)
+        # Always use our own lexer, PLY would otherwise fall back to the
+        # lexer that was built last in the process
+        if stats is None:
+            return self.parser.parse(text, lexer=self.lexer.lexer,
+                                     debug=False)
+        # PLY asks the lexer for each token as it goes, take the time spent
+        # in the lexer out of the parse time
+        lexed = stats.seconds('lex')
+        start = timeit.default_timer()
+        tree = self.parser.parse(text, debug=False,
+                                 lexer=stats.timed_lexer(self.lexer.lexer))
+        elapsed = timeit.default_timer() - start
+        stats.add('parse', elapsed - (stats.seconds('lex') - lexed))
         return tree
 
     def p_document(self, p):
         '''document :
                     | document block'''
         if len(p) == 1:
-            p[0] = ['document', []]
+            p[0] = self._node('document', [])
         else:
-            p[0] = ['document', p[1][1] + [p[2]]]
+            # Append in place, copying the list would be quadratic
+            p[1][1].append(p[2])
+            p[0] = p[1]
 
     def p_block(self, p):
         '''block : heading
@@ -50,19 +244,27 @@ class MarkdownParser:
                  | olist
                  | block_code
                  | blockercode
-                 | blockquote
                  | horizontalline
                  | table
                  | ref_link_url'''
         p[0] = p[1]
 
+    def p_block_blockquote(self, p):
+        '''block : blockquote'''
+        # The lines of the quote come last to first, see p_blockquote
+        children = []
+        for line in reversed(p[1]):
+            children.extend(line)
+        p[0] = self._node('blockquote', children)
+
     def p_olist(self, p):
         '''olist : olist_item
                 | olist olist_item'''
         if len(p) == 2:
-            p[0] = ['olist', [p[1]]]
+            p[0] = self._node('olist', [p[1]])
         else:
-            p[0] = ['olist', p[1][1] + [p[2]]]
+            p[1][1].append(p[2])
+            p[0] = p[1]
 
     def p_olist_item(self, p):
         '''olist_item : OLIST_ITEM_START phrase_list
@@ -71,19 +273,21 @@ class MarkdownParser:
                       | OLIST_ITEM_START phrase_list SINGLE_NEWLINE ulist'''
         if len(p) == 3 or len(p) == 4:
             # Contains a phrase list or is the last item
-            p[0] = ['list_item', p[2]]
+            p[0] = self._node('list_item', p[2])
         elif len(p) == 5:
             # Contains a nested list after the phrase list
             # Need this to make the nested list part of the previous list_item
-            p[0] = ['list_item', p[2] + [p[4]]]
+            p[2].append(p[4])
+            p[0] = self._node('list_item', p[2])
 
     def p_olist_2(self, p):
         '''olist_2 : olist_item_2
                    | olist_2 olist_item_2'''
         if len(p) == 2:
-            p[0] = ['olist', [p[1]]]
+            p[0] = self._node('olist', [p[1]])
         else:
-            p[0] = ['olist', p[1][1] + [p[2]]]
+            p[1][1].append(p[2])
+            p[0] = p[1]
 
     def p_olist_item_2(self, p):
         '''olist_item_2 : OLIST_ITEM_2_START phrase_list
@@ -92,19 +296,21 @@ class MarkdownParser:
                        | OLIST_ITEM_2_START phrase_list SINGLE_NEWLINE ulist'''
         if len(p) == 3 or len(p) == 4:
             # Contains a phrase list or is the last item
-            p[0] = ['list_item', p[2]]
+            p[0] = self._node('list_item', p[2])
         elif len(p) == 5:
             # Contains a nested list after the phrase list
             # Need this to make the nested list part of the previous list_item
-            p[0] = ['list_item', p[2] + [p[4]]]
+            p[2].append(p[4])
+            p[0] = self._node('list_item', p[2])
 
     def p_olist_3(self, p):
         '''olist_3 : olist_item_3
                    | olist_3 olist_item_3'''
         if len(p) == 2:
-            p[0] = ['olist', [p[1]]]
+            p[0] = self._node('olist', [p[1]])
         else:
-            p[0] = ['olist', p[1][1] + [p[2]]]
+            p[1][1].append(p[2])
+            p[0] = p[1]
 
     def p_olist_item_3(self, p):
         '''olist_item_3 : OLIST_ITEM_3_START phrase_list
@@ -113,53 +319,58 @@ class MarkdownParser:
                        | OLIST_ITEM_3_START phrase_list SINGLE_NEWLINE ulist'''
         if len(p) == 3 or len(p) == 4:
             # Contains a phrase list or is the last item
-            p[0] = ['list_item', p[2]]
+            p[0] = self._node('list_item', p[2])
         elif len(p) == 5:
             # Contains a nested list after the phrase list
             # Need this to make the nested list part of the previous list_item
-            p[0] = ['list_item', p[2] + [p[4]]]
+            p[2].append(p[4])
+            p[0] = self._node('list_item', p[2])
 
     def p_olist_4(self, p):
         '''olist_4 : olist_item_4
                   | olist_4 olist_item_4'''
         if len(p) == 2:
-            p[0] = ['olist', [p[1]]]
+            p[0] = self._node('olist', [p[1]])
         else:
-            p[0] = ['olist', p[1][1] + [p[2]]]
+            p[1][1].append(p[2])
+            p[0] = p[1]
 
     def p_olist_item_4(self, p):
         '''olist_item_4 : OLIST_ITEM_4_START phrase_list
                         | OLIST_ITEM_4_START phrase_list LIST_END'''
         # There is a maximum of 4 nested lists
-        p[0] = ['list_item', p[2]]
+        p[0] = self._node('list_item', p[2])
 
     def p_ulist(self, p):
         '''ulist : ulist_item
                 | ulist ulist_item'''
         if len(p) == 2:
-            p[0] = ['ulist', [p[1]]]
+            p[0] = self._node('ulist', [p[1]])
         else:
-            p[0] = ['ulist', p[1][1] + [p[2]]]
+            p[1][1].append(p[2])
+            p[0] = p[1]
 
     def p_ulist_item(self, p):
         '''ulist_item : ULIST_ITEM_START phrase_list
                       | ULIST_ITEM_START phrase_list LIST_END
                       | ULIST_ITEM_START phrase_list SINGLE_NEWLINE olist_2'''
-        numsps = re.search('(\x80\x80)*', p[1]).end()
-        numtab = re.search('(\x81\x81)*', p[1]).end()
-        if numsps > 0:
-            p[1] = str(int(numsps / 2))
-        elif numtab > 0:
-            p[1] = str(int(numtab / 2))
+        # One level per two spaces or per tab, whichever comes first
+        if p[1].startswith(' '):
+            p[1] = str(int(re.match('(  )*', p[1]).end() / 2))
         else:
-            p[1] = '0'
+            p[1] = str(re.match('\t*', p[1]).end())
         if len(p) >= 3 and len(p) <= 4:
             # Contains a phrase list or is the last item and the identation
-            p[0] = ['list_uitem', p[2] + [p[1]]]
+            if self.typed_nodes:
+                p[0] = nodes.ListUItem(p[2], p[1])
+            else:
+                p[2].append(p[1])
+                p[0] = ['list_uitem', p[2]]
         elif len(p) == 5:
             # Contains a nested list after the phrase list
             # Need this to make the nested list part of the previous list_item
-            p[0] = ['list_uitem', p[2] + [p[4]]]
+            p[2].append(p[4])
+            p[0] = self._node('list_uitem', p[2])
 
     def p_heading(self, p):
         '''heading : HEADING_START phrase_list HEADING_END SINGLE_NEWLINE
@@ -167,37 +378,42 @@ class MarkdownParser:
         level = len(p[1].strip())
         if level > self.max_heading_level:
             self.max_heading_level = level
-        p[0] = ['heading', [p[2]], level]
+        p[0] = self._node('heading', [p[2]], level)
 
     def p_subheading(self, p):
         '''subheading : phrase_list SINGLE_NEWLINE UNDERDIVIDER bothendlines
                     | phrase_list SINGLE_NEWLINE HORIZONTALLINE bothendlines'''
-        p[0] = ['subheading', p[1]]
+        p[0] = self._node('subheading', p[1])
 
     def p_horizontalline(self, p):
         '''horizontalline : MULTIPLE_NEWLINES HORIZONTALLINE MULTIPLE_NEWLINES'''  # noqa
-        p[0] = ['horizontalline']
+        p[0] = self._node('horizontalline')
 
     def p_paragraph(self, p):
         '''paragraph : phrase_list MULTIPLE_NEWLINES'''
-        p[0] = ['paragraph', p[1]]
+        p[0] = self._node('paragraph', p[1])
 
     def p_figure(self, p):
         '''figure : FIG_START phrase_list FIG_URL MULTIPLE_NEWLINES'''
-        p[0] = ['figure', p[2], p[3]]
+        p[0] = self._node('figure', p[2], p[3])
 
     def p_table_body(self, p):
         '''table_body : TCONTENT SINGLE_NEWLINE table_body
                       | TCONTENT SINGLE_NEWLINE
                       | TCONTENT'''
+        # The rule is right recursive, so the last row is reduced first.
+        # Collect the rows backwards in a flat list, p_table reverses it.
         if len(p) == 4:
-            p[0] = ['table_body', p[1], p[3]]
+            p[3].append(p[1])
+            p[0] = p[3]
         else:
-            p[0] = ['table_body', p[1]]
+            p[0] = [p[1]]
 
     def p_table(self, p):
         '''table : TCONTENT SINGLE_NEWLINE TMARKER SINGLE_NEWLINE table_body bothendlines'''  # noqa
-        p[0] = ['table_head', p[1], p[5]]
+        rows = p[5]
+        rows.reverse()
+        p[0] = self._node('table_head', p[1], self._node('table_body', rows))
 
     def p_block_code(self, p):
         '''block_code : BLOCK_CODE'''
@@ -210,33 +426,35 @@ class MarkdownParser:
             language = re.match(r'^:::(.*)\n', code).group(1)
             # Remove the line
             code = re.sub(r'^.*\n', '', code)
-        p[0] = ['block_code', code, language]
+        p[0] = self._node('block_code', code, language)
 
     def p_blockercode(self, p):
         '''blockercode : BLOCKERCODEONE bothendlines
                        | BLOCKERCODETWO bothendlines'''
-        p[1] = p[1].replace('\x80\x80', '  ')
-        p[1] = p[1].replace('\x81\x81', '\t')
         language = p[1][3:].split('\n')[0]
         code = '\n'.join(p[1][3:-3].split('\n')[1:])
-        p[0] = ['blocker_code', code, language]
+        p[0] = self._node('blocker_code', code, language)
 
     def p_blockquote(self, p):
         '''blockquote : BLOCKQUOTE phrase_list MULTIPLE_NEWLINES
                       | BLOCKQUOTE phrase_list blockquote
                       | BLOCKQUOTE SINGLE_NEWLINE blockquote
                       | BLOCKQUOTE MULTIPLE_NEWLINES'''
-        if len(p) == 2:
-            p[0] = [p[1]]
+        # Like table_body the rule is right recursive: collect the phrases
+        # of each line from the last line to the first (appending, not
+        # copying all the lines after each one) and let p_block_blockquote
+        # put them in order
+        if len(p) == 3:
+            # An empty last line
+            p[0] = [[]]
         elif p[2] == '\n':
-            p[0] = ['blockquote', [['text', ' '], ['text', '\n']] + p[3][1]]
-        elif len(p) > 2 and p[3] != '\n\n':
-            if isinstance(p[3][1], list):
-                p[0] = ['blockquote', p[2] + p[3][1]]
-            else:
-                p[0] = ['blockquote', p[2]]
+            p[3].append([self._node('text', ' '), self._node('text', '\n')])
+            p[0] = p[3]
+        elif isinstance(p[3], list):
+            p[3].append(p[2])
+            p[0] = p[3]
         else:
-            p[0] = ['blockquote', p[2]]
+            p[0] = [p[2]]
 
     def p_phrase_list(self, p):
         '''phrase_list : phrase
@@ -244,7 +462,8 @@ class MarkdownParser:
         if len(p) == 2:
             p[0] = [p[1]]
         else:
-            p[0] = p[1] + [p[2]]
+            p[1].append(p[2])
+            p[0] = p[1]
 
     def p_phrase(self, p):
         '''phrase : link
@@ -259,28 +478,28 @@ class MarkdownParser:
 
     def p_emphasisstrong(self, p):
         '''emphasisstrong : EMPHASISSTRONG'''
-        p[0] = ['emphasisstrong', p[1]]
+        p[0] = self._node('emphasisstrong', p[1])
 
     def p_emphasis(self, p):
         '''emphasis : EMPHASIS'''
-        p[0] = ['emphasis', p[1]]
+        p[0] = self._node('emphasis', p[1])
 
     def p_strong(self, p):
         '''strong : STRONG'''
-        p[0] = ['strong', p[1]]
+        p[0] = self._node('strong', p[1])
 
     def p_inline_code(self, p):
         '''inline_code : INLINE_CODE'''
         # INLINE_CODE token switches lexer state
-        p[0] = ['inline_code', p[1]]
+        p[0] = self._node('inline_code', p[1])
 
     def p_link(self, p):
         '''link : LINK_START phrase_list LINK_URL'''
-        p[0] = ['link', p[2], p[3]]
+        p[0] = self._node('link', p[2], p[3])
 
     def p_ref_link(self, p):
         '''ref_link : REF_LINK_START phrase_list REF_LINK_KEY'''
-        p[0] = ['ref_link', p[2], p[3]]
+        p[0] = self._node('ref_link', p[2], p[3])
 
     def p_ref_link_url(self, p):
         '''ref_link_url : REF_LINK_URL bothendlines'''
@@ -289,7 +508,7 @@ class MarkdownParser:
         key = vals[0].strip()[1:-1]
         url = vals[1].strip()
         # Don't actually need this below
-        p[0] = ['ref_link_url', key, url]
+        p[0] = self._node('ref_link_url', key, url)
 
         self.ref_link_table[key] = url
 
@@ -299,9 +518,7 @@ class MarkdownParser:
                 | LINK_SPECIAL_CHARS
                 | SINGLE_NEWLINE
                 | ESCAPE_SEQUENCE'''
-        p[1] = p[1].replace('\x80\x80', '  ')
-        p[1] = p[1].replace('\x81\x81', '\t')
-        p[0] = ['text', p[1]]
+        p[0] = self._node('text', p[1])
 
     def p_bothendlines(self, p):
         ''' bothendlines : SINGLE_NEWLINE
@@ -311,68 +528,28 @@ class MarkdownParser:
     def p_error(self, p):
         print("Syntax error on token: %s" % p)
 
-    def r_node(self, node, parent=None):
-        # Really need to abstract this tree traversal
-        node_type = node[0]
-        if node_type == 'document':
-            for block in node[1]:
-                self.r_node(block, node)
-
-        elif node_type == 'heading':
-            # Invert heading levels (not doing this right now)
-            # node[2] = self.max_heading_level - node[2] + 1
-            for phrase in node[1]:
-                self.r_node(phrase, node)
-
-        elif node_type == 'table':
-            for element in node[1]:
-                self.r_node(element, node)
-
-        elif node_type == 'table_head':
-            for element in node[1]:
-                self.r_node(element, node)
-
-        elif node_type == 'table_body':
-            for element in node[1]:
-                self.r_node(element, node)
-
-        elif node_type == 'subheading':
-            self.r_node(node[1], node)
-
-        elif node_type == 'paragraph':
-            for phrase in node[1]:
-                self.r_node(phrase, node)
-
-        elif node_type == 'emphasisstrong':
-            for phrase in node[1]:
-                self.r_node(phrase, node)
-
-        elif node_type == 'emphasis':
-            for phrase in node[1]:
-                self.r_node(phrase, node)
-
-        elif node_type == 'strong':
-            for phrase in node[1]:
-                self.r_node(phrase, node)
-
-        elif node_type == 'inline_code':
-            self.r_node(node[1], node)
-
-        elif node_type == 'ref_link':
-            # Add the URL as another field (want to preserve they key)
-            key = node[2]
-            url = self.ref_link_table[key]
-            node.append(url)
-            self.r_node(node[1], node)
-
-        elif node_type == 'list':
-            for phrase in node[1]:
-                self.r_node(phrase, node)
-
-        elif node_type == 'list_item':
-            for phrase in node[1]:
-                self.r_node(phrase, node)
-
-        elif node_type == 'list_uitem':
-            for phrase in node[1]:
-                self.r_node(phrase, node)
+    def r_node(self, node, table=None):
+        # Fills in the url of reference links from `table` (key -> url, the
+        # definitions of the last document parsed by default), looking for
+        # them in the phrases of the node types in _R_NODE_CHILDREN. Uses
+        # a stack of nodes still to visit rather than recursing.
+        if table is None:
+            table = self.ref_link_table
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            node_type = node[0]
+            if node_type == 'ref_link':
+                # Add the URL as another field (want to preserve they key)
+                key = node[2]
+                url = table[key]
+                if isinstance(node, list):
+                    node.append(url)
+                else:
+                    node.url = url
+            elif isinstance(node_type, string_types) and \
+                    node_type in _R_NODE_CHILDREN:
+                # Skips the strings in list items (the indentation level),
+                # and visits the children in order
+                stack.extend([child for child in reversed(node[1])
+                              if not isinstance(child, string_types)])
@@ -0,0 +1,368 @@
+# -*- encoding: utf-8; -*-
+# Profiling of the lexer rules and of the grammar
+#
+# PLY combines the t_* rules of MarkdownLexer into a master regex per
+# lexer state and calls the rule's action when a function rule matches,
+# so a profiler of the Python code only shows PLY's token(). LexerProfile
+# instruments a lexer of its own instead, and counts for each rule and
+# lexer state (a rule of INITIAL matching in the link state counts for
+# link):
+#
+#     matches   how often the rule matched (for rules checking what follows
+#               in their action, like t_LINK_START, how often that check
+#               was made)
+#     bytes     the input consumed, which is more than the regex matched
+#               for rules finding their closing delimiter themselves
+#     seconds   the time spent in the action
+#     retyped   matches the action turned into another token type
+#     dropped   matches the action returned no token for
+#
+# along with the t_error calls of each state and the bytes they skipped.
+#
+# GrammarProfile does the same for the p_* actions of a MarkdownParser,
+# counting for each production:
+#
+#     reductions  how often it was reduced
+#     seconds     the time spent in its action
+#     copied      the elements of the lists its action built anew, either
+#                 the value of the production or the children of the node
+#                 it made. A list taken from the right-hand side (e.g.
+#                 appended to) counts for nothing, so rules copying what
+#                 they reduced so far stand out, and grow faster than the
+#                 document.
+#
+# and the tokens shifted, by type.
+#
+#     python rydown/profiling.py [--grammar] [--limit 20] FILE
+from __future__ import print_function
+
+import argparse
+import io
+import sys
+import timeit
+
+from lexer import MarkdownLexer
+from parser import MarkdownParser, _lstrip
+import nodes
+
+timer = timeit.default_timer
+
+
+class RuleStats(object):
+    __slots__ = ('matches', 'bytes', 'seconds', 'retyped', 'dropped')
+
+    def __init__(self):
+        self.matches = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.retyped = 0
+        self.dropped = 0
+
+
+class ErrorStats(object):
+    __slots__ = ('calls', 'bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+
+
+class LexerProfile(object):
+    # Call run() with one or more documents, then look at `rules`,
+    # (state, rule name) -> RuleStats, and `errors`, state -> ErrorStats,
+    # or print report().
+
+    def __init__(self):
+        # Instrumenting changes the lexer's tables, never do it to a lexer
+        # a parser uses
+        self.markdown_lexer = MarkdownLexer()
+        self.rules = {}
+        self.errors = {}
+        self.documents = 0
+        self.size = 0
+        self.tokens = 0
+        self.seconds = 0.0
+        self._instrument()
+
+    def _instrument(self):
+        lexer = self.markdown_lexer.lexer
+        for state, master in lexer.lexstatere.items():
+            # Inclusive states share the rule lists of INITIAL, build new
+            # ones for each state
+            lexer.lexstatere[state] = [
+                (regex, [self._wrap(state, rule) for rule in rules])
+                for regex, rules in master]
+        error = self._error_handler(self.markdown_lexer.t_error)
+        # Actions that give up call t_error themselves
+        self.markdown_lexer.t_error = error
+        for state in lexer.lexstateerrorf:
+            lexer.lexstateerrorf[state] = error
+        self.markdown_lexer.reset()
+
+    def _wrap(self, state, rule):
+        # PLY keeps (action or None, token type) at the index of each
+        # rule's group in the master regex, and None at the others
+        if rule is None or rule[1] is None:
+            return rule
+        action, token_type = rule
+        if action is None:
+            name = 't_' + token_type
+        else:
+            name = action.__name__
+        stats = self.rules.setdefault((state, name), RuleStats())
+
+        def profiled(t):
+            start = timer()
+            result = t if action is None else action(t)
+            stats.seconds += timer() - start
+            stats.matches += 1
+            stats.bytes += t.lexer.lexpos - t.lexpos
+            if result is None:
+                stats.dropped += 1
+            elif result.type != token_type:
+                stats.retyped += 1
+            return result
+        return profiled, token_type
+
+    def _error_handler(self, t_error):
+        def profiled(t):
+            lexer = t.lexer
+            stats = self.errors.get(lexer.current_state())
+            if stats is None:
+                stats = self.errors[lexer.current_state()] = ErrorStats()
+            start = lexer.lexpos
+            t_error(t)
+            stats.calls += 1
+            stats.bytes += lexer.lexpos - start
+        return profiled
+
+    def run(self, text):
+        # Lexes `text` the way MarkdownParser.parse does, adding to the
+        # counts. Returns the number of tokens.
+        lexer = self.markdown_lexer.lexer
+        self.markdown_lexer.reset()
+        text = _lstrip(text)
+        tokens = 0
+        start = timer()
+        lexer.input(text)
+        for _ in iter(lexer.token, None):
+            tokens += 1
+        self.seconds += timer() - start
+        self.documents += 1
+        self.size += len(text)
+        self.tokens += tokens
+        return tokens
+
+    def ranked(self):
+        # (state, rule, stats) of the rules that matched, the most time
+        # spent in their action first
+        return sorted([key + (stats,) for key, stats in self.rules.items()
+                       if stats.matches],
+                      key=lambda r: (-r[2].seconds, -r[2].matches, r[:2]))
+
+    def report(self, limit=None):
+        actions = sum(stats.seconds for stats in self.rules.values())
+        lines = [
+            '%d bytes, %d tokens in %.3f ms (%.3f ms in actions)' % (
+                self.size, self.tokens, self.seconds * 1e3, actions * 1e3),
+            '',
+            '%-10s %-26s %9s %10s %11s %8s %8s' % (
+                'state', 'rule', 'matches', 'bytes', 'action ms', 'retyped',
+                'dropped'),
+        ]
+        for state, rule, stats in self.ranked()[:limit]:
+            lines.append('%-10s %-26s %9d %10d %11.3f %8d %8d' % (
+                state, rule, stats.matches, stats.bytes, stats.seconds * 1e3,
+                stats.retyped, stats.dropped))
+        if self.errors:
+            lines.extend(['', '%-10s %-26s %9s %10s' % (
+                'state', '', 'calls', 'skipped')])
+            for state in sorted(self.errors):
+                stats = self.errors[state]
+                lines.append('%-10s %-26s %9d %10d' % (
+                    state, 't_error', stats.calls, stats.bytes))
+        return '\n'.join(lines)
+
+
+def profile_lexer(text):
+    profile = LexerProfile()
+    profile.run(text)
+    return profile
+
+
+class ProductionStats(object):
+    __slots__ = ('action', 'reductions', 'seconds', 'copied')
+
+    def __init__(self, action):
+        self.action = action
+        self.reductions = 0
+        self.seconds = 0.0
+        self.copied = 0
+
+
+class GrammarProfile(object):
+    # Call run() with one or more documents, then look at `productions`,
+    # production (e.g. "block -> paragraph") -> ProductionStats, and
+    # `shifts`, token type -> count, or print report().
+
+    # Orders of report()
+    ORDERS = {
+        'reductions': lambda stats: -stats.reductions,
+        'seconds': lambda stats: -stats.seconds,
+        'copied': lambda stats: -stats.copied,
+    }
+
+    def __init__(self, typed_nodes=False):
+        # The actions are replaced in this parser's tables only
+        self.markdown_parser = MarkdownParser(typed_nodes)
+        self.productions = {}
+        self.shifts = {}
+        self.documents = 0
+        self.size = 0
+        self.seconds = 0.0
+        for production in self.markdown_parser.parser.productions:
+            if production.callable is not None:
+                production.callable = self._wrap(production)
+
+    def _wrap(self, production):
+        action = production.callable
+        stats = self.productions.setdefault(
+            production.str, ProductionStats(production.func))
+
+        def profiled(p):
+            start = timer()
+            action(p)
+            stats.seconds += timer() - start
+            stats.reductions += 1
+            stats.copied += _copied(p[0], [p[i] for i in range(1, len(p))])
+        return profiled
+
+    def run(self, text):
+        # Parses `text` the way MarkdownParser.parse does, without filling
+        # in reference links, adding to the counts. Returns the tree.
+        markdown_parser = self.markdown_parser
+        markdown_parser.max_heading_level = 0
+        markdown_parser.ref_link_table = {}
+        markdown_parser.list_stack = []
+        markdown_parser.lexer.reset()
+        text = _lstrip(text)
+        lexer = _CountingLexer(markdown_parser.lexer.lexer, self.shifts)
+        start = timer()
+        tree = markdown_parser.parser.parse(text, lexer=lexer, debug=False)
+        self.seconds += timer() - start
+        self.documents += 1
+        self.size += len(text)
+        return tree
+
+    def ranked(self, order='reductions'):
+        # (production, stats) of the productions reduced, in `order`
+        key = self.ORDERS[order]
+        return sorted([(production, stats)
+                       for production, stats in self.productions.items()
+                       if stats.reductions],
+                      key=lambda r: (key(r[1]), r[0]))
+
+    def report(self, limit=None, order='reductions'):
+        actions = sum(stats.seconds for stats in self.productions.values())
+        reductions = sum(stats.reductions
+                         for stats in self.productions.values())
+        lines = [
+            '%d bytes, %d tokens, %d reductions in %.3f ms '
+            '(%.3f ms in actions)' % (
+                self.size, sum(self.shifts.values()), reductions,
+                self.seconds * 1e3, actions * 1e3),
+            '',
+            '%10s %11s %10s  %-20s %s' % (
+                'reductions', 'action ms', 'copied', 'action', 'production'),
+        ]
+        for production, stats in self.ranked(order)[:limit]:
+            lines.append('%10d %11.3f %10d  %-20s %s' % (
+                stats.reductions, stats.seconds * 1e3, stats.copied,
+                stats.action, production))
+        lines.extend(['', '%10s  %s' % ('shifts', 'token')])
+        shifts = sorted(self.shifts.items(), key=lambda r: (-r[1], r[0]))
+        for token_type, count in shifts[:limit]:
+            lines.append('%10d  %s' % (count, token_type))
+        return '\n'.join(lines)
+
+
+def _lists(value):
+    # The lists holding what a value is made of: the fields of a node, or
+    # the value itself
+    if isinstance(value, nodes.Node):
+        fields = [getattr(value, field) for field in value.fields]
+    elif (type(value) is list and value and isinstance(value[0], str) and
+            value[0] in nodes.KINDS):
+        fields = value[1:]
+    else:
+        fields = [value]
+    return [field for field in fields if type(field) is list]
+
+
+def _copied(result, values):
+    reused = set()
+    for value in values:
+        reused.add(id(value))
+        reused.update(id(field) for field in _lists(value))
+    if id(result) in reused:
+        return 0
+    return sum(len(field) for field in _lists(result)
+               if id(field) not in reused)
+
+
+class _CountingLexer(object):
+    # What PLY's parser uses of a lexer, counting the tokens by type
+
+    def __init__(self, lexer, counts):
+        self._lexer = lexer
+        self._token = lexer.token
+        self._counts = counts
+
+    def __getattr__(self, name):
+        return getattr(self._lexer, name)
+
+    def input(self, text):
+        self._lexer.input(text)
+
+    def token(self):
+        token = self._token()
+        if token is not None:
+            self._counts[token.type] = self._counts.get(token.type, 0) + 1
+        return token
+
+
+def profile_grammar(text):
+    profile = GrammarProfile()
+    profile.run(text)
+    return profile
+
+
+def main(argv=None):
+    args = argparse.ArgumentParser(
+        description='Profile the lexer rules, or the grammar, on a Markdown '
+        'document.')
+    args.add_argument('file', help='Markdown file, - for standard input')
+    args.add_argument('--grammar', action='store_true',
+                      help='profile the p_* actions instead of the lexer')
+    args.add_argument('--order', choices=sorted(GrammarProfile.ORDERS),
+                      default='reductions',
+                      help='order of the productions with --grammar '
+                      '(default: %(default)s)')
+    args.add_argument('--limit', type=int, default=20,
+                      help='number of rules to list (default: %(default)s)')
+    options = args.parse_args(argv)
+    if options.file == '-':
+        text = sys.stdin.read()
+    else:
+        with io.open(options.file, encoding='utf-8') as f:
+            text = f.read()
+    limit = options.limit or None
+    if options.grammar:
+        print(profile_grammar(text).report(limit, options.order))
+    else:
+        print(profile_lexer(text).report(limit))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,346 +1,412 @@
 
-import re
+import copy
+import timeit
+import types
 
-from pygments.lexers import get_lexer_by_name
-from pygments.formatters import HtmlFormatter
-from pygments import highlight
+import codesyntax
+import highlight
+import nodes
+import typography
 
-from codesyntax.RysObjectiveCLexer import RysObjectiveCLexer
-from codesyntax.RysGitLexer import RysGitLexer
-from codesyntax.RysGitOutputLexer import RysGitOutputLexer
 
+def serialize(node, stats=None):
+    # `stats` is an optional stats.RenderStats timing each phase
+    if stats is None:
+        return r_node(node)
+    return html.render(node, stats)
 
-def serialize(node):
-    return r_node(node)
 
+def mediawiki_serialize(node, stats=None):
+    if stats is None:
+        return r_wiki_node(node)
+    return mediawiki.render(node, stats)
 
-def mediawiki_serialize(node):
-    return r_wiki_node(node)
 
+def serialize_to(node, fp):
+    _write_blocks(node, fp, write_node)
 
-def r_node(node):
-    node_type = node[0]
-    out = ""
-    if node_type == 'document':
-        for block in node[1]:
-            out += r_node(block)
-
-    elif node_type == 'heading':
-        out += "<h%s>" % node[2]
-        for phrase in node[1]:
-            out += r_node(phrase)
-        out += "</h%s>" % node[2]
 
-    elif node_type == 'subheading':
-        a = node[1].pop()
-        out += "<h1>%s</h1>" % a[1]
+def mediawiki_serialize_to(node, fp):
+    _write_blocks(node, fp, write_wiki_node)
 
-    elif node_type == 'paragraph':
-        out += "<p>"
-        for phrase in node[1]:
-            out += r_node(phrase)
-        out += "</p>"
 
-    elif node_type == 'emphasisstrong':
-        out += "<em><strong>"
-        for phrase in node[1]:
-            out += r_node(phrase)
-        out += "</strong></em>"
+def _write_blocks(node, fp, write_block):
+    # Write each top-level block of a document as soon as it is rendered,
+    # so only one block's output is held in memory at a time
+    if node[0] != 'document':
+        blocks = [node]
+    else:
+        blocks = node[1]
+    for block in blocks:
+        out = []
+        write_block(block, out.append)
+        chunk = ''.join(out)
+        # No empty writes for blocks rendering nothing
+        if chunk:
+            fp.write(chunk)
 
-    elif node_type == 'emphasis':
-        out += "<em>"
-        for phrase in node[1]:
-            out += r_node(phrase)
-        out += "</em>"
 
-    elif node_type == 'strong':
-        out += "<strong>"
-        for phrase in node[1]:
-            out += r_node(phrase)
-        out += "</strong>"
+def r_node(node):
+    return html.render(node)
 
-    elif node_type == 'inline_code':
+
+def r_wiki_node(node):
+    return mediawiki.render(node)
+
+
+# The write_* functions hand every piece of output to `write` (list.append,
+# the write method of a file...) instead of returning strings up the tree,
+# so each byte is copied once and not once per nesting level.
+def write_node(node, write):
+    html.write(node, write)
+
+
+def write_wiki_node(node, write):
+    mediawiki.write(node, write)
+
+
+def _function(method):
+    # The plain function behind a (bound or unbound) method
+    return getattr(method, '__func__', method)
+
+
+class Renderer(object):
+    # Renders a tree by looking up the handler of each node's type in
+    # `handlers`: the method named write_<node type>, e.g. write_paragraph.
+    # Nodes without a handler write nothing. To change how a node type is
+    # rendered, define its write_<node type> in a subclass or replace its
+    # entry in `handlers`.
+    #
+    # Handlers of nodes with children are generators: they yield a list of
+    # nodes wherever those should be written, e.g.
+    #
+    #     def write_link(self, node, write):
+    #         write("<a href='%s'>" % node[2])
+    #         yield node[1]
+    #         write("</a>")
+    #
+    # so the tree is walked with a stack instead of recursion, however deep
+    # it is. Handlers that just write (or render children themselves) work
+    # too.
+    typography = None
+
+    def __init__(self):
+        self.handlers = {}
+        for name in nodes.NAMES:
+            handler = getattr(self, 'write_' + name, None)
+            if handler is not None:
+                self.handlers[name] = handler
+
+    def render(self, node, stats=None):
+        if stats is not None:
+            return self._render_timed(node, stats)
+        out = []
+        self.write(node, out.append)
+        return ''.join(out)
+
+    def _render_timed(self, node, stats):
+        # Highlighting and typography are timed on their own and left out
+        # of the serialize phase
+        before = stats.seconds('highlight') + stats.seconds('typography')
+        start = timeit.default_timer()
+        rendered = self.instrumented(stats).render(node)
+        elapsed = timeit.default_timer() - start
+        after = stats.seconds('highlight') + stats.seconds('typography')
+        stats.add('serialize', elapsed - (after - before))
+        return rendered
+
+    def instrumented(self, stats):
+        # A copy of this renderer reporting the time spent in typography
+        # and in block_code (highlighting) to `stats`
+        renderer = copy.copy(self)
+        renderer.typography = stats.timed_typography(self.typography)
+        renderer.handlers = {}
+        for name, handler in self.handlers.items():
+            # Handlers of this renderer must see the copy's typography
+            if getattr(handler, '__self__', None) is self:
+                handler = types.MethodType(_function(handler), renderer)
+            renderer.handlers[name] = handler
+        if 'block_code' in renderer.handlers:
+            renderer.handlers['block_code'] = stats.timed_code_block(
+                renderer.handlers['block_code'])
+        return renderer
+
+    def write(self, node, write):
+        handler = self._handler(node)
+        if handler is None:
+            return
+        pending = handler(node, write)
+        if pending is None:
+            return
+        handlers = self.handlers
+        # Suspended handlers (generators), each one with the iterator over
+        # the nodes it yielded above it
+        stack = [pending]
+        while stack:
+            top = stack[-1]
+            if type(top) is types.GeneratorType:
+                children = next(top, None)
+                if children is None:
+                    stack.pop()
+                else:
+                    stack.append(iter(children))
+                continue
+            for item in top:
+                try:
+                    handler = handlers.get(item[0])
+                except TypeError:
+                    # See _handler
+                    continue
+                if handler is not None:
+                    pending = handler(item, write)
+                    if pending is not None:
+                        # Go on with this iterator once the handler is done
+                        stack.append(pending)
+                        break
+            else:
+                stack.pop()
+
+    def _handler(self, node):
+        try:
+            return self.handlers.get(node[0])
+        except TypeError:
+            # A list of phrases (headings have one as their only child),
+            # there is nothing to write
+            return None
+
+    def write_phrases(self, phrases, write):
+        # Paragraphs with many text nodes get them transformed in one batch,
+        # unless text nodes have their own handler. Yields the phrases left
+        # to write, like a handler.
+        texts = [phrase[1] for phrase in phrases if phrase[0] == 'text']
+        if (len(texts) < 4 or
+                _function(self.handlers.get('text')) is not _WRITE_TEXT):
+            yield phrases
+            return
+        texts = iter(self.typography.transform_many(texts))
+        for phrase in phrases:
+            if phrase[0] == 'text':
+                write(next(texts))
+            else:
+                yield [phrase]
+
+    def write_text(self, node, write):
+        write(self.typography.transform(node[1]))
+
+
+_WRITE_TEXT = _function(Renderer.write_text)
+
+
+class HtmlRenderer(Renderer):
+    typography = typography.html
+
+    def write_document(self, node, write):
+        yield node[1]
+
+    def write_heading(self, node, write):
+        write("<h%s>" % node[2])
+        yield node[1]
+        write("</h%s>" % node[2])
+
+    def write_subheading(self, node, write):
+        a = node[1].pop()
+        write("<h1>%s</h1>" % a[1])
+
+    def write_paragraph(self, node, write):
+        write("<p>")
+        for phrases in self.write_phrases(node[1], write):
+            yield phrases
+        write("</p>")
+
+    def write_emphasisstrong(self, node, write):
+        write("<em><strong>")
+        yield node[1]
+        write("</strong></em>")
+
+    def write_emphasis(self, node, write):
+        write("<em>")
+        yield node[1]
+        write("</em>")
+
+    def write_strong(self, node, write):
+        write("<strong>")
+        yield node[1]
+        write("</strong>")
+
+    def write_inline_code(self, node, write):
         # Only replace HTML special chars, not dashes like in text nodes
         value = node[1]
         value = value.replace('&', '&amp;')
         value = value.replace('<', '&lt;')
         value = value.replace('>', '&gt;')
-        out += "<code>%s</code>" % value
+        write("<code>%s</code>" % value)
 
-    elif node_type == 'link':
-        out += "<a href='%s'>" % node[2]
-        for phrase in node[1]:
-            out += r_node(phrase)
-        out += "</a>"
+    def write_link(self, node, write):
+        write("<a href='%s'>" % node[2])
+        yield node[1]
+        write("</a>")
 
-    elif node_type == 'ref_link':
+    def write_ref_link(self, node, write):
         # Key is in node[2] if you want to display traditional footnotes
-        out += "<a href='%s'>" % node[3]
-        for phrase in node[1]:
-            out += r_node(phrase)
-        out += "</a>"
-
-    elif node_type == 'figure':
-        out += "<figure><img src='%s' /><figcaption>" % node[2]
-        for phrase in node[1]:
-            out += r_node(phrase)
-        out += "</figcaption></figure>"
-
-    elif node_type == 'ulist':
-        out += "<ul>"
-        for item in node[1]:
-            out += r_node(item)
-        out += "</ul>"
-
-    elif node_type == 'olist':
-        out += "<ol>"
-        for item in node[1]:
-            out += r_node(item)
-        out += "</ol>"
-
-    elif node_type == 'list_item':
-        out += "<li>"
-        for phrase_or_list in node[1]:
-            out += r_node(phrase_or_list)
-        out += "</li>"
-
-    elif node_type == 'blocker_code':
+        write("<a href='%s'>" % node[3])
+        yield node[1]
+        write("</a>")
+
+    def write_figure(self, node, write):
+        write("<figure><img src='%s' /><figcaption>" % node[2])
+        yield node[1]
+        write("</figcaption></figure>")
+
+    def write_ulist(self, node, write):
+        write("<ul>")
+        yield node[1]
+        write("</ul>")
+
+    def write_olist(self, node, write):
+        write("<ol>")
+        yield node[1]
+        write("</ol>")
+
+    def write_list_item(self, node, write):
+        write("<li>")
+        yield node[1]
+        write("</li>")
+
+    def write_blocker_code(self, node, write):
         language = node[2]
         if language == '':
             language = 'text'
-        out += "<code language='{}'>".format(language)
-        for phrase_or_list in node[1]:
-            out += r_node(phrase_or_list)
-        out += "</code>"
+        write("<code language='{}'>".format(language))
+        yield node[1]
+        write("</code>")
 
-    elif node_type == 'block_code':
+    def write_block_code(self, node, write):
         language = node[2]
         if node[2] == '':
             language = 'text'
+        write(highlight.render(node[1], language, highlight.HTML))
 
-        # Convert tabs to spaces
-        content = re.sub(r'\t', '    ', node[1])
-        # Use Pygments to highlight the code block
-        formatter = HtmlFormatter(encoding='utf-8')
-        rendered = highlight(content, get_lexer(language), formatter)
-        rendered = rendered.replace('<div class="highlight"><pre>', '<pre>')
-        rendered = rendered.replace('</pre></div>', '</pre>')
-        rendered = rendered.replace('<span', '<code')
-        rendered = rendered.replace('</span>', '</code>')
-        out += rendered
-
-    elif node_type == 'text':
-        value = node[1].replace('\n', ' ')
-        # Replace HTML entities (order matters!)
-        value = re.sub(r"&(?!(\w|#)\w+;)", "&amp;", value)
-        value = value.replace('---', '&mdash;')
-        value = value.replace('--', '&ndash;')
-        value = value.replace('<', '&lt;')
-        value = value.replace('>', '&gt;')
-
-        # --- Replace straight quotes with curly quotes (order matters!) ---
-        # General rule: if it's touching a non-space/non-quote,turn it that way
-
-        # Minor hack for avoiding start/end pattern mating
-        value = " " + value + " "
 
-        # Double quote edge cases
-        value = re.sub(r"(?<![ ])\"'", "&rdquo;&rsquo;", value)
-        value = re.sub(r"\"'(?![ ])", "&ldquo;&lsquo;", value)
-        value = re.sub(r"(?<![ ])'\"", "&rsquo;&rdquo;", value)
-        value = re.sub(r"'\"(?![ ])", "&lsquo;&ldquo;", value)
+class MediaWikiRenderer(Renderer):
+    typography = typography.mediawiki
 
-        # Single quotes (turn right first for apostrophes
-        value = re.sub(r"(?<![ ])'", "&rsquo;", value)
-        value = re.sub(r"'(?![ ])", "&lsquo;", value)
+    def write_document(self, node, write):
+        yield node[1]
 
-        # Double quotes
-        value = re.sub(r"(?<![ ])\"", "&rdquo;", value)
-        value = re.sub(r"\"(?![ ])", "&ldquo;", value)
+    def write_heading(self, node, write):
+        write("=" * int(node[2]) + " ")
+        yield node[1]
+        write(" " + "=" * int(node[2]) + '\n')
 
-        # Remove minor hack
-        value = value[1:-1]
-
-        out += value
-
-    return out
-
-
-def r_wiki_node(node):
-    node_type = node[0]
-    out = ""
-    if node_type == 'document':
-        for block in node[1]:
-            out += r_wiki_node(block)
-
-    elif node_type == 'heading':
-        out += "=" * int(node[2]) + " "
-        for phrase in node[1]:
-            out += r_wiki_node(phrase)
-        out += " " + "=" * int(node[2]) + '\n'
-
-    elif node_type == 'subheading':
+    def write_subheading(self, node, write):
         a = node[1].pop()
-        out += "= %s =\n" % a[1]
+        write("= %s =\n" % a[1])
 
-    elif node_type == 'horizontalline':
-        out += "----\n"
+    def write_horizontalline(self, node, write):
+        write("----\n")
 
-    elif node_type == 'blockquote':
-        text = ''
-        for phrase in node[1]:
-            text += r_wiki_node(phrase)
-        out += "<blockquote><p>{}</p></blockquote>\n".format(text)
+    def write_blockquote(self, node, write):
+        write("<blockquote><p>")
+        yield node[1]
+        write("</p></blockquote>\n")
 
-    elif node_type == 'paragraph':
-        out += "<p>"
-        for phrase in node[1]:
-            out += r_wiki_node(phrase)
-        out += "</p>\n"
+    def write_paragraph(self, node, write):
+        write("<p>")
+        for phrases in self.write_phrases(node[1], write):
+            yield phrases
+        write("</p>\n")
 
-    elif node_type == 'emphasisstrong':
-        out += "''''' " + node[1] + " '''''"
+    def write_emphasisstrong(self, node, write):
+        write("''''' " + node[1] + " '''''")
 
-    elif node_type == 'emphasis':
-        out += "'' " + node[1] + " ''"
+    def write_emphasis(self, node, write):
+        write("'' " + node[1] + " ''")
 
-    elif node_type == 'strong':
-        out += "''' " + node[1] + " '''"
+    def write_strong(self, node, write):
+        write("''' " + node[1] + " '''")
 
-    elif node_type == 'inline_code':
+    def write_inline_code(self, node, write):
         # Only replace HTML special chars, not dashes like in text nodes
         value = node[1]
         value = value.replace('&', '&amp;')
         value = value.replace('<', '&lt;')
         value = value.replace('>', '&gt;')
-        out += "<code>%s</code>" % value
+        write("<code>%s</code>" % value)
 
-    elif node_type == 'link':
-        text = ''
-        for phrase in node[1]:
-            text += r_wiki_node(phrase)
-        out += "[{} {}]".format(node[2], text)
+    def write_link(self, node, write):
+        write("[{} ".format(node[2]))
+        yield node[1]
+        write("]")
 
-    elif node_type == 'ref_link':
+    def write_ref_link(self, node, write):
         # Key is in node[2] if you want to display traditional footnotes
-        text = ''
-        for phrase in node[1]:
-            text += r_node(phrase)
         url = node[3].split(' ')[0]
-        out += "[{}#{} {}]".format(url, node[2], text)
-
-    elif node_type == 'figure':
-        text = ''
+        write("[{}#{} ".format(url, node[2]))
+        # The link text is written as HTML
         for phrase in node[1]:
-            text += r_wiki_node(phrase)
-        out += ("<span class=\"plainlinks\">"
-                "[{{{{fullurl:{}}}}} {}]</span>".format(text, node[2]))
+            html.write(phrase, write)
+        write("]")
+
+    def write_figure(self, node, write):
+        write("<span class=\"plainlinks\">[{{fullurl:")
+        yield node[1]
+        write("}}}} {}]</span>".format(node[2]))
 
-    elif node_type == 'table_head':
-        out += "\n{|\n"
-        out += '!' + node[1].replace('|', '\n!')
+    def write_table_head(self, node, write):
+        write("\n{|\n")
+        write('!' + node[1].replace('|', '\n!'))
         if len(node) == 3:
-            out += '\n|-\n'
-            out += r_wiki_node(node[2])
+            write('\n|-\n')
+            yield [node[2]]
         # int(k[1:k.find('}')])
-        out += "\n|}\n"
+        write("\n|}\n")
 
-    elif node_type == 'table_body':
-        out += '|' + node[1].replace('|', '\n|')
-        if len(node) == 3:
-            out += '\n|-\n'
-            out += r_wiki_node(node[2])
+    def write_table_body(self, node, write):
+        write('\n|-\n'.join(['|' + row.replace('|', '\n|')
+                               for row in node[1]]))
 
-    elif node_type == 'ulist':
-        for item in node[1]:
-            out += r_wiki_node(item)
+    def write_ulist(self, node, write):
+        yield node[1]
 
-    elif node_type == 'olist':
-        out += "<ol>\n"
-        for item in node[1]:
-            out += r_wiki_node(item)
-        out += "</ol>\n"
+    def write_olist(self, node, write):
+        write("<ol>\n")
+        yield node[1]
+        write("</ol>\n")
 
-    elif node_type == 'list_uitem':
+    def write_list_uitem(self, node, write):
         identation = '*' * int(node[1][-1])
-        phrase_or_list = ['phrase_list', node[1]]
-        out += '*' + identation
+        write('*' + identation)
         for phrase_or_list in node[1]:
-            out += r_wiki_node(phrase_or_list).strip()
-        out += "\n"
+            # Every child is stripped on its own
+            write(self.render(phrase_or_list).strip())
+        write("\n")
 
-    elif node_type == 'list_item':
-        out += '<li>'
+    def write_list_item(self, node, write):
+        write('<li>')
         for phrase_or_list in node[1]:
-            out += r_wiki_node(phrase_or_list).strip()
-        out += "</li>\n"
+            write(self.render(phrase_or_list).strip())
+        write("</li>\n")
 
-    elif node_type == 'blocker_code':
+    def write_blocker_code(self, node, write):
         language = node[2]
         if node[2] == '':
             language = 'text'
-        out += ("<syntaxhighlight lang='{}'>"
-                "{}</syntaxhighlight>\n".format(language, node[1]))
+        write("<syntaxhighlight lang='{}'>"
+              "{}</syntaxhighlight>\n".format(language, node[1]))
 
-    elif node_type == 'block_code':
+    def write_block_code(self, node, write):
         language = node[2]
         if node[2] == '':
             language = 'text'
-        # Convert tabs to spaces
-        content = re.sub(r'\t', '    ', node[1])
-        # Use Pygments to highlight the code block
-        formatter = HtmlFormatter(encoding='utf-8')
-        rendered = highlight(content, get_lexer(language), formatter)
-        rendered = rendered.replace('<div class="highlight"><pre>', '<pre>')
-        rendered = rendered.replace('</pre></div>', '</pre>')
-        rendered = rendered.replace('<span>', '')
-        rendered = rendered.replace('</span>', '')
-        out += rendered
-
-    elif node_type == 'text':
-        value = node[1].replace('\n', '/n')
-        # Replace HTML entities (order matters!)
-        value = re.sub(r"&(?!(\w|#)\w+;)", "&amp;", value)
-        value = value.replace('<', '&lt;')
-        value = value.replace('>', '&gt;')
-
-        # --- Replace straight quotes with curly quotes (order matters!) ---
-        # General rule: if it's touching a non-space/non-quote,turn it that way
+        write(highlight.render(node[1], language, highlight.MEDIAWIKI))
 
-        # Minor hack for avoiding start/end pattern mating
-        value = " " + value + " "
 
-        # Double quote edge cases
-        value = re.sub(r"(?<![ ])\"'", "&rdquo;&rsquo;", value)
-        value = re.sub(r"\"'(?![ ])", "&ldquo;&lsquo;", value)
-        value = re.sub(r"(?<![ ])'\"", "&rsquo;&rdquo;", value)
-        value = re.sub(r"'\"(?![ ])", "&lsquo;&ldquo;", value)
-
-        # Single quotes (turn right first for apostrophes
-        value = re.sub(r"(?<![ ])'", "&rsquo;", value)
-        value = re.sub(r"'(?![ ])", "&lsquo;", value)
-
-        # Double quotes
-        value = re.sub(r"(?<![ ])\"", "&rdquo;", value)
-        value = re.sub(r"\"(?![ ])", "&ldquo;", value)
-
-        # Remove minor hack
-        value = value[1:-1]
-
-        value = value.replace('/n', '\n')
-        out += value
-    return out
+# Renderers used by the functions above, replace them to change the output
+# of serialize() and friends
+html = HtmlRenderer()
+mediawiki = MediaWikiRenderer()
 
 
 def get_lexer(language):
-    # Checks custom lexers first
-    custom_lexers = {
-        'obj-c': RysObjectiveCLexer(),
-        'git': RysGitLexer(),
-        'git-out': RysGitOutputLexer(),
-    }
-
-    if language in custom_lexers:
-        return custom_lexers[language]
-    else:
-        return get_lexer_by_name(language)
+    # Custom lexers first, then Pygments, see codesyntax
+    return codesyntax.get_lexer(language)
@@ -0,0 +1,158 @@
+# -*- encoding: utf-8; -*-
+# Where the time of a conversion goes
+#
+# Pass a RenderStats to rydown.to_html, rydown.to_mediawiki (or the same
+# methods of an Engine) and it gets the wall time and number of calls of
+# each phase of the conversion:
+#
+#     lex         the MarkdownLexer rules, one call per token
+#     parse       the LALR parser and the p_* actions, lexing excluded
+#     r_node      filling in the urls of reference links
+#     serialize   walking the tree, highlighting and typography excluded
+#     highlight   Pygments (or the highlight cache), one call per code block
+#     typography  the typography regexes
+#     total       the whole conversion
+#
+# along with the language, size and time of every highlighted code block.
+# Nothing is measured (and nothing costs more) without one. A document
+# found in the render cache (see cache.py) isn't converted and adds
+# nothing.
+from __future__ import print_function
+
+import contextlib
+import timeit
+import types
+
+timer = timeit.default_timer
+
+PHASES = ('lex', 'parse', 'r_node', 'serialize', 'highlight', 'typography',
+          'total')
+
+
+class RenderStats(object):
+    # Collects the phases of the conversions it is passed to, adding them
+    # up when it is passed to several. Don't share one between threads.
+
+    def __init__(self):
+        # phase -> [seconds, calls]
+        self.phases = {}
+        # (language, characters, seconds) of each highlighted code block
+        self.code_blocks = []
+
+    def add(self, phase, seconds, calls=1):
+        entry = self.phases.get(phase)
+        if entry is None:
+            self.phases[phase] = [seconds, calls]
+        else:
+            entry[0] += seconds
+            entry[1] += calls
+
+    @contextlib.contextmanager
+    def timing(self, phase):
+        start = timer()
+        try:
+            yield
+        finally:
+            self.add(phase, timer() - start)
+
+    def seconds(self, phase):
+        return self.phases.get(phase, (0.0, 0))[0]
+
+    def calls(self, phase):
+        return self.phases.get(phase, (0.0, 0))[1]
+
+    def clear(self):
+        self.phases.clear()
+        del self.code_blocks[:]
+
+    def report(self):
+        # The phases as a table, slowest code blocks last
+        lines = ['%-12s %12s %10s' % ('phase', 'ms', 'calls')]
+        for phase in PHASES:
+            if phase in self.phases:
+                lines.append('%-12s %12.3f %10d' % (
+                    phase, self.seconds(phase) * 1e3, self.calls(phase)))
+        blocks = sorted(self.code_blocks, key=lambda block: -block[2])
+        for language, characters, seconds in blocks[:10]:
+            lines.append('code block %-12s %8d chars %10.3f ms' % (
+                language, characters, seconds * 1e3))
+        return '\n'.join(lines)
+
+    # Used by the parser and the renderers
+
+    def timed_lexer(self, lexer):
+        return _TimedLexer(lexer, self)
+
+    def timed_typography(self, typography):
+        return _TimedTypography(typography, self)
+
+    def timed_code_block(self, handler):
+        def write_block_code(node, write):
+            start = timer()
+            result = handler(node, write)
+            seconds = timer() - start
+            if type(result) is types.GeneratorType:
+                return self._timed_steps(node, result, seconds)
+            self._add_code_block(node, seconds)
+            return result
+        return write_block_code
+
+    def _timed_steps(self, node, steps, seconds):
+        # A generator handler (see serializer.Renderer) is timed over its
+        # whole iteration, leaving out the children it yields: the renderer
+        # writes those in between, and they are timed on their own
+        while True:
+            start = timer()
+            children = next(steps, None)
+            seconds += timer() - start
+            if children is None:
+                break
+            yield children
+        self._add_code_block(node, seconds)
+
+    def _add_code_block(self, node, seconds):
+        self.add('highlight', seconds)
+        self.code_blocks.append((node[2] or 'text', len(node[1]), seconds))
+
+
+class _TimedLexer(object):
+    # What PLY's parser uses of a lexer, timing each token
+
+    def __init__(self, lexer, stats):
+        self._lexer = lexer
+        self._token = lexer.token
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._lexer, name)
+
+    def input(self, text):
+        self._lexer.input(text)
+
+    def token(self):
+        start = timer()
+        token = self._token()
+        self._stats.add('lex', timer() - start)
+        return token
+
+
+class _TimedTypography(object):
+
+    def __init__(self, typography, stats):
+        self._typography = typography
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._typography, name)
+
+    def transform(self, value):
+        start = timer()
+        value = self._typography.transform(value)
+        self._stats.add('typography', timer() - start)
+        return value
+
+    def transform_many(self, values):
+        start = timer()
+        values = self._typography.transform_many(values)
+        self._stats.add('typography', timer() - start)
+        return values
@@ -0,0 +1,106 @@
+# -*- encoding: utf-8; -*-
+# Prebuilt PLY tables
+#
+# The lexer master regexes (lextab.py) and the LALR tables (parsetab.py)
+# are generated when the package is built (see setup.py) or by running
+# this module, and are only ever read at runtime. When they are missing
+# or were generated from other rules, MarkdownLexer and MarkdownParser
+# build them in memory instead and never write them back.
+import contextlib
+import hashlib
+import importlib
+import os
+import sys
+
+import ply.lex as lex
+
+LEXTAB = 'lextab'
+PARSETAB = 'parsetab'
+
+
+def _qualified(name):
+    package = __name__.rpartition('.')[0]
+    if package:
+        return package + '.' + name
+    return name
+
+
+def _import_table(name):
+    try:
+        return importlib.import_module(_qualified(name))
+    except ImportError:
+        return None
+
+
+def lexer_signature(lexer):
+    # Everything PLY reads from the lexer to build its master regexes.
+    # Function rules are matched in definition order, so keep that order.
+    rules = [(name, getattr(lexer, name))
+             for name in dir(lexer) if name.startswith('t_')]
+    functions = sorted([r for r in rules if callable(r[1])],
+                       key=lambda r: r[1].__code__.co_firstlineno)
+    strings = sorted([r for r in rules if not callable(r[1])])
+    parts = [repr(list(lexer.tokens)), repr(lexer.states)]
+    for name, rule in functions:
+        parts.append('%s %s' % (name, getattr(rule, 'regex', rule.__doc__)))
+    for name, rule in strings:
+        parts.append('%s %s' % (name, rule))
+    return hashlib.md5('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def load_lextab(lexer):
+    # Returns the prebuilt lextab module if it matches the lexer rules
+    lextab = _import_table(LEXTAB)
+    if lextab is None:
+        return None
+    if getattr(lextab, '_tabversion', None) != lex.__tabversion__:
+        return None
+    if getattr(lextab, '_signature', None) != lexer_signature(lexer):
+        return None
+    return lextab
+
+
+def load_parsetab():
+    # yacc checks the grammar signature stored in parsetab by itself
+    return _import_table(PARSETAB)
+
+
+@contextlib.contextmanager
+def _hidden_tables():
+    # Make PLY build from the rules instead of loading existing tables
+    names = set()
+    for name in (LEXTAB, PARSETAB):
+        names.add(name)
+        names.add(_qualified(name))
+    saved = dict((name, sys.modules.get(name)) for name in names)
+    for name in names:
+        sys.modules[name] = None
+    try:
+        yield
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+def generate(outputdir):
+    import ply.yacc as yacc
+    from lexer import MarkdownLexer
+    from parser import MarkdownParser
+
+    with _hidden_tables():
+        markdown_lexer = MarkdownLexer()
+        markdown_lexer.lexer.writetab(LEXTAB, outputdir)
+        filename = os.path.join(outputdir, LEXTAB + '.py')
+        with open(filename, 'a') as tf:
+            tf.write('_signature    = %r\n' % lexer_signature(markdown_lexer))
+
+        markdown_parser = MarkdownParser()
+        yacc.yacc(module=markdown_parser, tabmodule=PARSETAB,
+                  outputdir=outputdir, write_tables=True, debug=False)
+
+
+if __name__ == '__main__':
+    generate(os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,25 @@
+# -*- encoding: utf-8; -*-
+# The output targets
+#
+# Everything taking a target name (Engine.convert, rydown.cache, batch,
+# incremental and the rydown command) looks it up here, so a target is
+# added in one place.
+import collections
+
+import serializer
+
+# `serialize` renders a tree, or a block of one, with an optional
+# RenderStats. `extension` is given to the files the rydown command writes.
+Target = collections.namedtuple('Target', 'name serialize extension')
+
+TARGETS = {
+    'html': Target('html', serializer.serialize, '.html'),
+    'mediawiki': Target('mediawiki', serializer.mediawiki_serialize, '.wiki'),
+}
+
+
+def get_target(name):
+    try:
+        return TARGETS[name]
+    except KeyError:
+        raise ValueError("Unknown target %r" % (name,))
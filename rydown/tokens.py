@@ -0,0 +1,49 @@
+# -*- encoding: utf-8; -*-
+# The token stream of a document, without parsing it
+#
+# tokenize() runs the lexer MarkdownParser uses over a document and
+# yields its tokens as they are found, for tools that don't need the
+# tree (search indexing, syntax colouring...) and shouldn't pay for
+# parsing and rendering.
+import collections
+
+from lexer import MarkdownLexer
+from parser import _lstrip
+
+# One token. `start` and `end` are offsets in the text given to tokenize,
+# `end` just past everything the token stands for (a fenced code block
+# ends after its closing fence even though its value is dedented), and
+# `line` is the line of `start`, counting from 1.
+Token = collections.namedtuple('Token', 'type value start end line')
+
+# Lexers not in use by a tokenize() generator. Generators can be consumed
+# at the same time, so each one takes a lexer of its own.
+_idle = []
+
+
+def tokenize(text):
+    # Yields the Tokens of `text` lazily. Like MarkdownParser.parse, the
+    # leading blank lines and spaces are skipped and characters no rule
+    # matches are reported and dropped.
+    try:
+        markdown_lexer = _idle.pop()
+    except IndexError:
+        markdown_lexer = MarkdownLexer()
+    try:
+        stripped = _lstrip(text)
+        offset = len(text) - len(stripped)
+        line = 1 + text.count('\n', 0, offset)
+        counted = offset
+        markdown_lexer.reset()
+        lexer = markdown_lexer.lexer
+        lexer.input(stripped)
+        for token in iter(lexer.token, None):
+            start = token.lexpos + offset
+            # Tokens may span lines, count the newlines ourselves rather
+            # than trusting the lexer's lineno
+            line += text.count('\n', counted, start)
+            counted = start
+            yield Token(token.type, token.value, start,
+                        lexer.lexpos + offset, line)
+    finally:
+        _idle.append(markdown_lexer)
@@ -0,0 +1,87 @@
+# -*- encoding: utf-8; -*-
+# Typography of text nodes: HTML entities, dashes and curly quotes
+#
+# Every rule is compiled once. Entities and dashes are replaced in a single
+# scan, quotes in at most three more, and only when the text has quotes.
+# A paragraph's text nodes can be transformed in one go with transform_many.
+import re
+
+# Start or end of a node, in transform_many several nodes are joined
+# with this character
+SEPARATOR = '\x00'
+
+# --- Replace straight quotes with curly quotes (order matters!) ---
+# General rule: if it's touching a non-space/non-quote, turn it that way.
+# The start and end of a node count as spaces.
+_AFTER_TEXT = r'(?<=[^ \x00])'
+_BEFORE_TEXT = r'(?=[^ \x00])'
+# Double quote edge cases first...
+_QUOTE_PASSES = [
+    ('"\'', re.compile(_AFTER_TEXT + '("\')|("\')' + _BEFORE_TEXT)),
+    ('\'"', re.compile(_AFTER_TEXT + '(\'")|(\'")' + _BEFORE_TEXT)),
+]
+# ...then single and double quotes, turning right first for apostrophes
+_QUOTES = re.compile(_AFTER_TEXT + '([\'"])|([\'"])' + _BEFORE_TEXT)
+
+_RIGHT = {"'": '&rsquo;', '"': '&rdquo;'}
+_LEFT = {"'": '&lsquo;', '"': '&ldquo;'}
+
+
+def _curly(match):
+    # Odd groups are touching text on their left, even ones on their right
+    quotes = _RIGHT if match.lastindex % 2 else _LEFT
+    return ''.join([quotes[c] for c in match.group(match.lastindex)])
+
+
+class Transformer(object):
+    # `replacements` are plain strings to replace, they are found in a
+    # single scan so longer strings must come first when they overlap.
+    # Lone ampersands (not starting an entity) are always escaped.
+
+    def __init__(self, replacements, restore=None):
+        self.replacements = dict(replacements)
+        self.replacements['&'] = '&amp;'
+        self.restore = restore
+        pattern = '|'.join([re.escape(old) for old, _ in replacements])
+        self._first = re.compile(r'&(?!(\w|#)\w+;)|' + pattern)
+
+    def _replace(self, match):
+        return self.replacements[match.group()]
+
+    def transform(self, value):
+        value = self._first.sub(self._replace, value)
+        if "'" in value or '"' in value:
+            for quotes, pattern in _QUOTE_PASSES:
+                if quotes in value:
+                    value = pattern.sub(_curly, value)
+            value = _QUOTES.sub(_curly, value)
+        if self.restore is not None:
+            value = value.replace(*self.restore)
+        return value
+
+    def transform_many(self, values):
+        # Same as [transform(v) for v in values] with one pass over all
+        if len(values) < 2:
+            return [self.transform(v) for v in values]
+        joined = SEPARATOR.join(values)
+        if joined.count(SEPARATOR) != len(values) - 1:
+            return [self.transform(v) for v in values]
+        return self.transform(joined).split(SEPARATOR)
+
+
+# Newlines become spaces, and dashes become en and em dashes
+html = Transformer([
+    ('\n', ' '),
+    ('---', '&mdash;'),
+    ('--', '&ndash;'),
+    ('<', '&lt;'),
+    ('>', '&gt;'),
+])
+
+# Newlines are kept (written as /n while quotes are replaced), and so are
+# dashes
+mediawiki = Transformer([
+    ('\n', '/n'),
+    ('<', '&lt;'),
+    ('>', '&gt;'),
+], restore=('/n', '\n'))
@@ -4,10 +4,30 @@
 
 from setuptools import setup, find_packages
 from os import path
+import sys
 import versioneer
 
 here = path.abspath(path.dirname(__file__))
 
+cmdclass = versioneer.get_cmdclass()
+_build_py = cmdclass['build_py']
+
+
+class build_py(_build_py):
+    # Ship the PLY lexer and parser tables so they are never built at runtime
+    def run(self):
+        _build_py.run(self)
+        sys.path.insert(0, path.join(here, 'rydown'))
+        try:
+            import tables
+        except ImportError as e:
+            print("Not generating PLY tables: %s" % e)
+            return
+        tables.generate(path.join(self.build_lib, 'rydown'))
+
+
+cmdclass['build_py'] = build_py
+
 long_description = """
 # Ry's Markdown implementation #
 
@@ -28,7 +48,7 @@ See https://rypress.com/rydown for more information.
 setup(
     name='rydown',
     version=versioneer.get_version(),
-    cmdclass=versioneer.get_cmdclass(),
+    cmdclass=cmdclass,
     description='A formal Markdown lexer/parser',
     long_description=long_description,
 
@@ -70,4 +90,7 @@ setup(
     keywords='markdown',
     packages=['rydown', 'rydown.codesyntax'],
     install_requires=['ply', 'pygments'],
+    entry_points={
+        'console_scripts': ['rydown = rydown.cli:main'],
+    },
 )
@@ -0,0 +1,73 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import pytest
+
+DOCUMENTS = [
+    "# Heading 1\n",
+    "* apples\n  * oranges\n\n",
+    "[an example][missing]\n\n",
+    "A [link](https://www.example.com) with *emphasis*.\n\n",
+]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_convert_many_in_order(workers):
+    results = list(rydown.convert_many(DOCUMENTS, workers=workers))
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    assert [r.source for r in results] == DOCUMENTS
+    for i in (0, 1, 3):
+        assert results[i].output == rydown.to_mediawiki(DOCUMENTS[i])
+        assert results[i].error is None
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_convert_many_reports_failures(workers):
+    results = list(rydown.convert_many(DOCUMENTS, workers=workers))
+    assert results[2].output is None
+    assert results[2].error == "KeyError: 'missing'"
+
+
+def test_convert_many_as_completed():
+    results = rydown.convert_many(DOCUMENTS * 3, target='html', workers=2,
+                                  ordered=False, chunksize=1)
+    results = sorted(results, key=lambda r: r.index)
+    assert [r.index for r in results] == list(range(12))
+    assert results[4].output == rydown.to_html(DOCUMENTS[0])
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_convert_files(tmpdir, workers):
+    path = tmpdir.join('doc.md')
+    path.write("## Heading 2\n")
+    missing = str(tmpdir.join('missing.md'))
+    first, second = rydown.convert_files([str(path), missing],
+                                         workers=workers)
+    assert first.output == "== Heading 2 ==\n"
+    assert second.output is None
+    assert second.error.startswith(('IOError', 'FileNotFoundError'))
+
+
+def test_convert_many_never_reads_files(tmpdir):
+    tmpdir.join('doc.md').write("## Heading 2\n")
+    with tmpdir.as_cwd():
+        result, = rydown.convert_many(['doc.md'], workers=1)
+    # Converted as Markdown (which fails without a final newline), the
+    # file is never read
+    assert 'Heading' not in repr(result)
+
+
+def test_convert_many_checks_arguments():
+    with pytest.raises(ValueError):
+        rydown.convert_many(DOCUMENTS, target='pdf')
+    with pytest.raises(ValueError):
+        rydown.convert_many(DOCUMENTS, workers=0)
+    with pytest.raises(ValueError):
+        rydown.convert_files([], target='pdf')
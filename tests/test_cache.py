@@ -0,0 +1,104 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import pytest
+
+# The cache module rydown.to_html actually uses
+cache = rydown.cache
+
+DOCUMENTS = [
+    "# Heading 1\n",
+    "A [link](https://www.example.com) with *emphasis* and \"quotes\".\n\n",
+    "* apples\n  * oranges\n\n1. one\n2. two\n\n",
+    "a|b|c\n-|-|-\nd|e|f\n\n",
+    "    :::python\n    x = 1\n\n",
+]
+
+
+@pytest.fixture
+def render_cache():
+    render_cache = rydown.RenderCache(cache.MemoryBackend())
+    rydown.set_render_cache(render_cache)
+    yield render_cache
+    rydown.set_render_cache(None)
+
+
+def test_cached_results_are_identical(render_cache):
+    for text in DOCUMENTS:
+        uncached = rydown.get_engine().to_mediawiki(text)
+        assert rydown.to_mediawiki(text) == uncached
+        assert rydown.to_mediawiki(text) == uncached
+        assert rydown.to_html(text) == rydown.get_engine().to_html(text)
+    stats = render_cache.stats()
+    assert stats['hits'] == len(DOCUMENTS)
+    assert stats['misses'] == 2 * len(DOCUMENTS)
+    assert stats['entries'] == 2 * len(DOCUMENTS)
+
+
+def test_key_depends_on_target_and_version():
+    one = rydown.RenderCache(version='1.0')
+    two = rydown.RenderCache(version='2.0')
+    assert one.key('a', 'html') != one.key('a', 'mediawiki')
+    assert one.key('a', 'html') != two.key('a', 'html')
+    assert one.key('a', 'html') == one.key('a', 'html')
+
+
+def test_memory_backend_evicts_by_size():
+    backend = cache.MemoryBackend(max_bytes=10)
+    backend.put('a', '1234')
+    backend.put('b', '1234')
+    assert backend.get('a') == '1234'
+    backend.put('c', '1234')
+    # b was the least recently used
+    assert backend.get('b') is None
+    assert backend.get('a') == '1234'
+    assert backend.stats() == {'entries': 2, 'bytes': 8, 'evictions': 1,
+                               'evicted_bytes': 4}
+    # Too big to keep at all
+    backend.put('d', 'x' * 11)
+    assert backend.get('d') is None
+    assert len(backend) == 2
+
+
+def test_directory_backend(tmpdir):
+    backend = cache.DirectoryBackend(str(tmpdir.join('renders')))
+    render_cache = rydown.RenderCache(backend)
+    text = DOCUMENTS[1]
+    convert = rydown.get_engine().to_mediawiki
+    first = render_cache.render(text, 'mediawiki', convert)
+    # Another cache on the same directory, e.g. in the next process
+    again = rydown.RenderCache(cache.DirectoryBackend(backend.directory))
+    assert again.render(text, 'mediawiki', None) == first
+    assert again.stats() == {'hits': 1, 'misses': 0}
+    again.clear()
+    assert backend.get(render_cache.key(text, 'mediawiki')) is None
+
+
+def test_custom_backend(render_cache):
+    class Store(cache.Backend):
+        def __init__(self):
+            self.data = {}
+
+        def get(self, key):
+            return self.data.get(key)
+
+        def put(self, key, value):
+            self.data[key] = value
+
+    store = Store()
+    rydown.set_render_cache(rydown.RenderCache(store))
+    assert rydown.to_mediawiki(DOCUMENTS[0]) == "= Heading 1 =\n"
+    assert list(store.data.values()) == ["= Heading 1 =\n"]
+
+
+def test_failures_are_not_cached(render_cache):
+    with pytest.raises(KeyError):
+        rydown.to_mediawiki("[an example][missing]\n\n")
+    assert render_cache.stats()['entries'] == 0
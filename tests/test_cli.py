@@ -0,0 +1,92 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import rydown.cli as cli
+
+
+def _tree(tmpdir):
+    docs = tmpdir.mkdir('docs')
+    docs.join('index.md').write("# Heading 1\n")
+    docs.mkdir('guide').join('lists.md').write("* apples\n* oranges\n\n")
+    docs.join('notes.txt').write("not markdown")
+    return docs
+
+
+def _summary(capsys):
+    return capsys.readouterr()[1].strip().splitlines()[-1]
+
+
+def test_converts_directory_tree(tmpdir, capsys):
+    docs = _tree(tmpdir)
+    out = tmpdir.join('out')
+    assert cli.main([str(docs), '-o', str(out)]) == 0
+    assert out.join('index.wiki').read() == "= Heading 1 =\n"
+    assert out.join('guide', 'lists.wiki').read() == "*apples\n*oranges\n"
+    assert not out.join('notes.wiki').check()
+    assert _summary(capsys) == '2 converted, 0 unchanged, 0 failed'
+
+
+def test_skips_unchanged_files(tmpdir, capsys):
+    docs = _tree(tmpdir)
+    out = str(tmpdir.join('out'))
+    cli.main([str(docs), '-o', out, '-j', '2'])
+    capsys.readouterr()
+    assert cli.main([str(docs), '-o', out, '-j', '2']) == 0
+    assert _summary(capsys) == '0 converted, 2 unchanged, 0 failed'
+    docs.join('index.md').write("## Heading 2\n")
+    assert cli.main([str(docs), '-o', out]) == 0
+    assert _summary(capsys) == '1 converted, 1 unchanged, 0 failed'
+    assert tmpdir.join('out', 'index.wiki').read() == "== Heading 2 ==\n"
+    # Another target doesn't match the manifest, neither does --force
+    assert cli.main([str(docs), '-o', out, '-t', 'html']) == 0
+    assert _summary(capsys) == '2 converted, 0 unchanged, 0 failed'
+    assert cli.main([str(docs), '-o', out, '-t', 'html', '--force']) == 0
+    assert _summary(capsys) == '2 converted, 0 unchanged, 0 failed'
+
+
+def test_writes_next_to_sources(tmpdir, capsys):
+    source = tmpdir.join('page.md')
+    source.write("# Heading 1\n")
+    manifest = tmpdir.join('manifest.json')
+    assert cli.main([str(source), '--manifest', str(manifest)]) == 0
+    assert tmpdir.join('page.wiki').read() == "= Heading 1 =\n"
+    assert manifest.check()
+
+
+def test_reports_failures(tmpdir, capsys):
+    docs = _tree(tmpdir)
+    docs.join('broken.md').write("[an example][missing]\n\n")
+    out = str(tmpdir.join('out'))
+    assert cli.main([str(docs), '-o', out]) == 1
+    err = capsys.readouterr()[1]
+    assert "broken.md: KeyError: 'missing'" in err
+    assert err.strip().endswith('2 converted, 0 unchanged, 1 failed')
+    # Failed files are tried again next time
+    assert cli.main([str(docs), '-o', out]) == 1
+    assert _summary(capsys) == '0 converted, 2 unchanged, 1 failed'
+
+
+def test_refuses_to_overwrite_outputs(tmpdir, capsys):
+    docs = _tree(tmpdir)
+    docs.mkdir('other').join('index.md').write("## Heading 2\n")
+    out = tmpdir.join('out')
+    inputs = [str(docs.join('index.md')), str(docs.join('other', 'index.md'))]
+    assert cli.main(inputs + ['-o', str(out)]) == 1
+    err = capsys.readouterr()[1]
+    assert 'would overwrite the output of' in err
+    assert str(out.join('index.wiki')) in err
+    assert not out.check()
+    # The same file given twice, or mirrored directories, are fine
+    assert cli.main(inputs[:1] * 2 + [str(docs), '-o', str(out)]) == 0
+    assert out.join('index.wiki').read() == "= Heading 1 =\n"
+    assert out.join('other', 'index.wiki').read() == "== Heading 2 ==\n"
+    # x.md and x.markdown both become x.wiki
+    docs.join('index.markdown').write("# Heading 1\n")
+    assert cli.main([str(docs)]) == 1
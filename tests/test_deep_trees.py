@@ -0,0 +1,64 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import rydown.parser as parser
+import rydown.serializer as serializer
+
+ROWS = 100000
+
+
+def _table(rows):
+    return ("a|b|c\n-|-|-\n" +
+            "".join("d%d|e|f\n" % i for i in range(rows)) + "\n")
+
+
+def test_table_rows_are_flat():
+    tree = parser.MarkdownParser().parse(_table(3))
+    assert tree[1] == [['table_head', 'a|b|c',
+                        ['table_body', ['d0|e|f', 'd1|e|f', 'd2|e|f']]]]
+    assert serializer.mediawiki_serialize(tree) == (
+        "\n{|\n!a\n!b\n!c\n|-\n"
+        "|d0\n|e\n|f\n|-\n|d1\n|e\n|f\n|-\n|d2\n|e\n|f\n|}\n")
+
+
+def test_long_table():
+    tree = parser.MarkdownParser().parse(_table(ROWS))
+    rows = tree[1][0][2][1]
+    assert len(rows) == ROWS
+    assert rows[-1] == 'd%d|e|f' % (ROWS - 1)
+    wiki = serializer.mediawiki_serialize(tree)
+    assert wiki.count('\n|-\n') == ROWS
+    assert wiki.endswith('|d%d\n|e\n|f\n|}\n' % (ROWS - 1))
+
+
+def test_long_blockquote():
+    lines = 20000
+    text = "".join("> line %d\n" % i for i in range(lines)) + "\n"
+    tree = parser.MarkdownParser().parse(text)
+    assert len(tree[1]) == 1
+    phrases = tree[1][0][1]
+    assert phrases[0] == ['text', ' line 0']
+    assert phrases[-1] == ['text', ' line %d' % (lines - 1)]
+    wiki = serializer.mediawiki_serialize(tree)
+    assert wiki.startswith('<blockquote><p> line 0\n line 1\n')
+
+
+def test_blockquote_ending_the_document():
+    resp = rydown.to_mediawiki("> quote\n")
+    assert resp == "<blockquote><p> quote</p></blockquote>\n"
+
+
+def test_deep_tree_renders_without_recursion():
+    depth = sys.getrecursionlimit() * 2
+    node = ['text', 'deep']
+    for _ in range(depth):
+        node = ['link', [node], 'u']
+    html = serializer.serialize(['document', [node]])
+    assert html == "<a href='u'>" * depth + 'deep' + '</a>' * depth
@@ -0,0 +1,68 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import rydown.lexer as lexer
+
+
+def _tokens(text):
+    markdown_lexer = lexer.MarkdownLexer()
+    markdown_lexer.reset()
+    markdown_lexer.lexer.input(text)
+    return [(t.type, t.value)
+            for t in iter(markdown_lexer.lexer.token, None)]
+
+
+def test_comment_is_skipped_with_its_newlines():
+    assert _tokens("`a`<!-- x\n\n-- y -->\n\nb") == \
+        [('INLINE_CODE', 'a'), ('PLAINTEXT', 'b')]
+
+
+def test_unterminated_comment_is_text():
+    text = "<!--" + " \n" * 20000
+    tokens = _tokens(text)
+    assert tokens[0] == ('PLAINTEXT', '<!-- ')
+
+
+def test_fence_ends_at_first_backticks():
+    tokens = _tokens("```python\nx = 1\n```\n\n```\ny\n```")
+    assert tokens[0] == ('BLOCKERCODEONE', "```python\nx = 1\n```")
+    assert tokens[2] == ('BLOCKERCODETWO', "```text\ny\n```")
+
+
+def test_tilde_fence_without_backticks_ends_at_last_run():
+    tokens = _tokens("~~~a\nb\n~~~\nc\n~~~\n")
+    assert tokens[0] == ('BLOCKERCODEONE', "~~~a\nb\n~~~\nc\n~~~")
+
+
+def test_unterminated_fence():
+    tokens = _tokens("```python\n" + "x  y\n" * 20000)
+    assert tokens[0][0] != 'BLOCKERCODEONE'
+    assert ('PLAINTEXT', 'python') in tokens
+
+
+def test_links_and_figures():
+    assert _tokens("[a](b)")[:2] == [('LINK_START', '['), ('PLAINTEXT', 'a')]
+    assert _tokens("[a][k]")[0] == ('REF_LINK_START', '[')
+    assert _tokens("![a](b.png)")[0] == ('FIG_START', '![')
+    assert _tokens("[k]: http://k.com/")[0] == \
+        ('REF_LINK_URL', '[k]: http://k.com/')
+
+
+def test_unbalanced_brackets_are_text():
+    assert _tokens("a[i] [] [b](c d)") == [
+        ('PLAINTEXT', 'a'), ('LINK_SPECIAL_CHARS', '['),
+        ('PLAINTEXT', 'i'), ('LINK_SPECIAL_CHARS', ']'),
+        ('PLAINTEXT', ' '), ('LINK_SPECIAL_CHARS', '['),
+        ('LINK_SPECIAL_CHARS', ']'), ('PLAINTEXT', ' '),
+        ('LINK_SPECIAL_CHARS', '['), ('PLAINTEXT', 'b'),
+        ('LINK_SPECIAL_CHARS', ']'), ('PLAINTEXT', '(c d)'),
+    ]
+    tokens = _tokens("[" + "\n" * 40 + "]")
+    assert tokens[0] == ('LINK_SPECIAL_CHARS', '[')
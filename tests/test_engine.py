@@ -0,0 +1,122 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import threading
+import pytest
+
+
+def test_engine_is_shared():
+    assert rydown.get_engine() is rydown.get_engine()
+
+
+def test_engine_reuses_parser():
+    engine = rydown.Engine()
+    parser = engine.parser.parser
+    engine.to_mediawiki("# Heading 1\n")
+    engine.to_mediawiki("# Heading 1\n")
+    assert engine.parser.parser is parser
+
+
+def test_engine_resets_lexer_states():
+    engine = rydown.Engine()
+    # Simulate a previous document that left its states pushed
+    engine.parser.lexer.lexer.push_state('heading')
+    engine.parser.lexer.lexer.push_state('link')
+    resp = engine.to_mediawiki("## Heading 2\n")
+    assert resp == "== Heading 2 ==\n"
+    assert engine.parser.lexer.lexer.lexstatestack == []
+
+
+def test_engine_resets_ref_link_table():
+    engine = rydown.Engine()
+    engine.to_mediawiki("[an example][id]\n\n[id]: http://example.com/\n")
+    assert engine.parser.ref_link_table == {'id': 'http://example.com/'}
+    with pytest.raises(KeyError):
+        engine.to_mediawiki("[an example][id]\n\n")
+
+
+def test_engine_matches_module_helpers():
+    engine = rydown.Engine()
+    text = "* apples\n* oranges\n\n"
+    assert engine.to_mediawiki(text) == rydown.to_mediawiki(text)
+    assert engine.to_html(text) == rydown.to_html(text)
+
+
+def test_convert_by_target_name():
+    engine = rydown.Engine()
+    text = "* apples\n* oranges\n\n"
+    assert engine.convert(text, 'html') == engine.to_html(text)
+    assert engine.convert(text, 'mediawiki') == engine.to_mediawiki(text)
+    assert rydown.EnginePool(1).convert(text, 'html') == engine.to_html(text)
+    for convert in (engine.convert, rydown.convert_many, rydown.convert_files,
+                    rydown.IncrementalDocument):
+        with pytest.raises(ValueError):
+            list(convert(text, 'pdf'))
+
+
+STRESS_DOCUMENTS = [
+    "# Heading 1\n",
+    "Heading 1\n=========\nOnly one newline\n",
+    "* apples\n  * oranges\n    * pears\n\n",
+    "1. apples\n2. oranges\n3. pears\n\n",
+    "a|b|c\n-|-|-\nd|e|f\n\n",
+    "A [link](https://www.example.com).\n",
+    "[an example][id]\n\n[id]: http://example.com/\n",
+    "> Markdown uses email-style > characters for blockquoting.\n\n",
+    "```bash\nThis is a code block.```\n",
+    "\"Quotes\" and 'apostrophes' -- and dashes.\n",
+]
+
+
+def _render_concurrently(render, threads=8, rounds=20):
+    results = {}
+    errors = []
+
+    def worker(index):
+        try:
+            for round_ in range(rounds):
+                for i, text in enumerate(STRESS_DOCUMENTS):
+                    results[(index, round_, i)] = render(text)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(n,))
+               for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert errors == []
+    return results
+
+
+def test_concurrent_module_helpers_match_serial():
+    serial = [rydown.to_mediawiki(text) for text in STRESS_DOCUMENTS]
+    results = _render_concurrently(rydown.to_mediawiki)
+    for (_, _, i), resp in results.items():
+        assert resp == serial[i]
+
+
+def test_concurrent_pool_matches_serial():
+    serial = [rydown.to_mediawiki(text) for text in STRESS_DOCUMENTS]
+    pool = rydown.EnginePool(size=3)
+    results = _render_concurrently(pool.to_mediawiki)
+    for (_, _, i), resp in results.items():
+        assert resp == serial[i]
+    assert pool._built <= 3
+
+
+def test_pool_checkout_is_exclusive():
+    pool = rydown.EnginePool(size=2, prebuild=True)
+    with pool.checkout() as first:
+        with pool.checkout() as second:
+            assert first is not second
+    with pool.checkout() as again:
+        assert again in (first, second)
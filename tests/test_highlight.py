@@ -0,0 +1,147 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import rydown.highlight as highlight
+import rydown.serializer as serializer
+
+CODE = "git status\n\tgit add .\n"
+
+
+def test_render_flavours():
+    html = highlight.render_uncached(CODE, 'bash', highlight.HTML)
+    assert html.startswith('<pre>') and '<span' not in html
+    assert '\t' not in html
+    wiki = highlight.render_uncached(CODE, 'bash', highlight.MEDIAWIKI)
+    assert wiki.startswith('<pre>') and '<span>' not in wiki
+
+
+def test_cache_hits_and_flavours():
+    cache = highlight.HighlightCache()
+    for _ in range(3):
+        key = cache.key(CODE, 'bash', highlight.HTML)
+        if cache.get(key) is None:
+            cache.put(key, highlight.render_uncached(CODE, 'bash', 'html'))
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.key(CODE, 'bash', 'html') != cache.key(CODE, 'bash', 'mediawiki')
+    assert cache.key(CODE, 'bash', 'html') != cache.key(CODE, 'text', 'html')
+
+
+def test_cache_evicts_least_recently_used():
+    cache = highlight.HighlightCache(maxsize=2)
+    cache.put('a', 'A')
+    cache.put('b', 'B')
+    assert cache.get('a') == 'A'
+    cache.put('c', 'C')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A' and cache.get('c') == 'C'
+    assert len(cache) == 2
+
+
+def test_cache_directory(tmpdir):
+    directory = str(tmpdir.join('highlight'))
+    first = highlight.HighlightCache(directory=directory)
+    key = first.key(CODE, 'bash', 'html')
+    first.put(key, highlight.render_uncached(CODE, 'bash', 'html'))
+    second = highlight.HighlightCache(directory=directory)
+    assert second.get(key) == first.get(key)
+    assert second.hits == 1
+
+
+def test_serializer_uses_cache():
+    # The serializer may have imported its own copy of the module
+    used = serializer.highlight
+    cache = used.HighlightCache()
+    previous = used.cache
+    used.set_cache(cache)
+    try:
+        node = ['block_code', CODE, 'bash']
+        html = serializer.r_node(node)
+        assert serializer.r_node(node) == html
+        wiki = serializer.r_wiki_node(node)
+        assert wiki != html
+        assert (cache.hits, cache.misses) == (1, 2)
+    finally:
+        used.set_cache(previous)
+
+
+def test_lexers_are_built_once():
+    assert serializer.get_lexer('git') is serializer.get_lexer('git')
+    assert serializer.get_lexer('python') is serializer.get_lexer('python')
+    assert type(serializer.get_lexer('obj-c')).__name__ == 'RysObjectiveCLexer'
+
+
+def test_unknown_lexer_is_remembered():
+    from pygments.util import ClassNotFound
+    for _ in range(2):
+        try:
+            serializer.get_lexer('no-such-language')
+        except ClassNotFound:
+            pass
+        else:
+            assert False
+    assert serializer.codesyntax._lexers['no-such-language'] is None
+
+
+def test_register_lexer():
+    from pygments.lexers import PythonLexer
+    codesyntax = serializer.codesyntax
+    codesyntax.register_lexer('snake', PythonLexer)
+    try:
+        assert isinstance(serializer.get_lexer('snake'), PythonLexer)
+    finally:
+        codesyntax._factories.pop('snake')
+        codesyntax._lexers.pop('snake')
+        codesyntax._generations.pop('snake')
+
+
+def test_cache_key_includes_versions():
+    old = highlight.HighlightCache(version='rydown 1 pygments 2.0')
+    new = highlight.HighlightCache(version='rydown 1 pygments 2.1')
+    assert old.key(CODE, 'bash', 'html') != new.key(CODE, 'bash', 'html')
+    assert highlight.HighlightCache().key(CODE, 'bash', 'html') == \
+        highlight.HighlightCache().key(CODE, 'bash', 'html')
+
+
+def test_register_lexer_changes_cache_keys():
+    from pygments.lexers import PythonLexer, RubyLexer
+    codesyntax = serializer.codesyntax
+    cache = serializer.highlight.HighlightCache()
+    try:
+        before = cache.key(CODE, 'snake', 'html')
+        codesyntax.register_lexer('snake', PythonLexer)
+        python = cache.key(CODE, 'snake', 'html')
+        codesyntax.register_lexer('snake', RubyLexer)
+        ruby = cache.key(CODE, 'snake', 'html')
+        # Registered again, even with the same lexer
+        codesyntax.register_lexer('snake', RubyLexer)
+        again = cache.key(CODE, 'snake', 'html')
+        assert len(set([before, python, ruby, again])) == 4
+        assert isinstance(serializer.get_lexer('snake'), RubyLexer)
+    finally:
+        codesyntax._factories.pop('snake')
+        codesyntax._lexers.pop('snake', None)
+        codesyntax._generations.pop('snake')
+
+
+def test_register_lexer_forgets_unknown_alias():
+    from pygments.lexers import PythonLexer
+    codesyntax = serializer.codesyntax
+    try:
+        serializer.get_lexer('unknown-snake')
+    except Exception:
+        pass
+    assert codesyntax._lexers['unknown-snake'] is None
+    codesyntax.register_lexer('unknown-snake', PythonLexer)
+    try:
+        assert isinstance(serializer.get_lexer('unknown-snake'), PythonLexer)
+    finally:
+        codesyntax._factories.pop('unknown-snake')
+        codesyntax._lexers.pop('unknown-snake', None)
+        codesyntax._generations.pop('unknown-snake')
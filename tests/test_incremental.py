@@ -0,0 +1,87 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import pytest
+import rydown.incremental as incremental
+import rydown.parser as parser
+import rydown.targets as targets
+
+DOCUMENT = """# Heading 1
+
+A [reference][id] and a [link](https://www.example.com).
+
+* apples
+  * oranges
+
+```python
+x = 1
+
+y = 2
+```
+
+Another paragraph.
+
+[id]: http://example.com/
+
+"""
+
+
+def _full(source, target='mediawiki'):
+    engine = rydown.Engine()
+    render = targets.get_target(target).serialize
+    return ''.join(render(block) for block in engine.parse_iter(source))
+
+
+@pytest.mark.parametrize('target', ['mediawiki', 'html'])
+def test_first_update_renders_everything(target):
+    doc = incremental.IncrementalDocument(target)
+    assert doc.update(DOCUMENT) == _full(DOCUMENT, target)
+    assert doc.reused == 0
+    assert doc.update(DOCUMENT) == _full(DOCUMENT, target)
+    assert doc.parsed == 0
+
+
+def test_only_changed_blocks_are_rendered():
+    doc = incremental.IncrementalDocument()
+    doc.update(DOCUMENT)
+    edited = DOCUMENT.replace("Another paragraph.", "An *edited* paragraph.")
+    assert doc.update(edited) == _full(edited)
+    assert doc.parsed == 1
+    assert doc.reused == len(list(parser.split_blocks([edited]))) - 1
+    assert "'' edited ''" in doc.output
+
+
+def test_redefined_reference_rerenders_its_users():
+    doc = incremental.IncrementalDocument()
+    doc.update(DOCUMENT)
+    edited = DOCUMENT.replace("http://example.com/", "http://example.org/")
+    assert doc.update(edited) == _full(edited)
+    # The definition and the paragraph using it
+    assert doc.parsed == 2
+    assert '[http://example.org/#id ' in doc.output
+
+
+def test_inserted_blocks():
+    doc = incremental.IncrementalDocument()
+    doc.update(DOCUMENT)
+    edited = DOCUMENT.replace("Another paragraph.\n\n",
+                              "Another paragraph.\n\nNew one.\n\n> quote\n\n")
+    assert doc.update(edited) == _full(edited)
+    assert doc.parsed == 2
+
+
+def test_undefined_reference():
+    doc = incremental.IncrementalDocument()
+    doc.update(DOCUMENT)
+    with pytest.raises(KeyError):
+        doc.update(DOCUMENT.replace("[id]: http://example.com/", ""))
+    # The last good state is kept
+    assert doc.output == _full(DOCUMENT)
+    assert doc.update(DOCUMENT) == _full(DOCUMENT)
@@ -0,0 +1,54 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+
+
+def test_input_code_points_are_kept():
+    resp = rydown.to_mediawiki("a\x80\x80b \x81\x81c\n")
+    assert resp == "<p>a\x80\x80b \x81\x81c</p>\n"
+
+
+def test_double_spaces_are_kept():
+    resp = rydown.to_mediawiki("`a  b` and *c  d*\n")
+    assert resp == "<p><code>a  b</code> and '' c  d ''</p>\n"
+
+
+def test_leading_indentation_is_kept():
+    assert rydown.to_mediawiki("\n  leading\n") == "<p>  leading</p>\n"
+
+
+def test_list_levels_from_spaces_and_tabs():
+    resp = rydown.to_mediawiki("* a\n  * b\n\t\t* c\n    * d\n\n")
+    assert resp == "*a\n**b\n***c\n***d\n"
+
+
+def test_tab_indented_code():
+    resp = rydown.to_mediawiki("\tcode  line\n\n")
+    assert resp == "<pre>code  line\n</pre>\n"
+
+
+def test_tab_nested_ordered_list():
+    resp = rydown.to_mediawiki("1. a\n\t2. b\n\n")
+    assert resp == "<ol>\n<li>a<ol>\n<li>b</li>\n</ol></li>\n</ol>\n"
+
+
+def test_tab_after_strong_is_text():
+    resp = rydown.to_mediawiki("Some **bold**\tthen text.\n\n")
+    assert resp == "<p>Some ''' bold '''\tthen text.</p>\n"
+
+
+def test_tab_after_emphasis_is_text():
+    resp = rydown.to_mediawiki("a *b*\tc\n\n")
+    assert resp == "<p>a '' b ''\tc</p>\n"
+
+
+def test_tab_after_link_is_text():
+    resp = rydown.to_html("a [l](http://x)\tafter\n\n")
+    assert resp == "<p>a <a href='http://x'>l</a>\tafter</p>"
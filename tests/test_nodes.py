@@ -0,0 +1,116 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import pytest
+import rydown.parser as parser
+import rydown.serializer as serializer
+
+# The nodes module the parser actually uses
+nodes = parser.nodes
+
+DOCUMENT = """# Heading 1
+
+Subheading
+----------
+
+A [link](https://www.example.com) with *emphasis*, **strong**,
+***both***, `code` and a [reference][id].
+
+[id]: http://example.com/
+
+* apples
+  * oranges
+* pears
+
+1. one
+2. two
+    * nested
+
+> quoted
+> twice
+
+| a | b |
+|---|---|
+| 1 | 2 |
+| 3 | 4 |
+
+![a figure](fig.png)
+
+```python
+x = 1
+```
+
+    :::python
+    y = 2
+
+"""
+
+
+def _parsers():
+    return (parser.MarkdownParser(),
+            parser.MarkdownParser(typed_nodes=True))
+
+
+def test_typed_tree_converts_to_list_tree():
+    lists, typed = _parsers()
+    tree = typed.parse(DOCUMENT)
+    assert tree.kind == nodes.DOCUMENT
+    assert nodes.to_legacy(tree) == lists.parse(DOCUMENT)
+
+
+def test_typed_nodes_use_slots():
+    tree = _parsers()[1].parse(DOCUMENT)
+    for block in tree.children:
+        assert not hasattr(block, '__dict__')
+
+
+def test_typed_nodes_read_like_lists():
+    tree = _parsers()[1].parse("A [reference][id].\n\n[id]: http://a.com/\n\n")
+    ref_link = tree[1][0][1][1]
+    assert ref_link[0] == 'ref_link'
+    assert ref_link.url == ref_link[3] == 'http://a.com/'
+    assert len(ref_link) == 4
+    assert list(ref_link)[2] == 'id'
+
+
+def test_typed_tree_serializes_the_same():
+    lists, typed = _parsers()
+    assert (serializer.serialize(typed.parse(DOCUMENT)) ==
+            serializer.serialize(lists.parse(DOCUMENT)))
+    assert (serializer.mediawiki_serialize(typed.parse(DOCUMENT)) ==
+            serializer.mediawiki_serialize(lists.parse(DOCUMENT)))
+
+
+def test_typed_parse_iter():
+    lists, typed = _parsers()
+    blocks = [nodes.to_legacy(b) for b in typed.parse_iter(DOCUMENT)]
+    assert blocks == list(lists.parse_iter(DOCUMENT))
+
+
+def test_typed_nodes_index_like_lists():
+    lists, typed = _parsers()
+    stack = [(typed.parse(DOCUMENT), lists.parse(DOCUMENT))]
+    stack.append((nodes.RefLink([], 'id'), ['ref_link', [], 'id']))
+    stack.append((nodes.BlockCode('x = 1\n', None), ['block_code', 'x = 1\n']))
+    while stack:
+        node, expected = stack.pop()
+        if not isinstance(node, nodes.Node):
+            assert nodes.to_legacy(node) == expected
+            if isinstance(node, list):
+                stack.extend(zip(node, expected))
+            continue
+        for index in range(-len(expected), len(expected)):
+            if index > 0:
+                stack.append((node[index], expected[index]))
+            assert nodes.to_legacy(node[index]) == expected[index]
+        for index in (len(expected), len(expected) + 1):
+            with pytest.raises(IndexError):
+                node[index]
+        assert nodes.to_legacy(node[1:]) == expected[1:]
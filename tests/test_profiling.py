@@ -0,0 +1,111 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+from rydown import profiling
+
+DOCUMENT = (
+    "# Heading\n\n"
+    "A [link](http://example.com) and a [ref][key] and [brackets].\n\n"
+    "<!-- a comment -->\n\n"
+    "* one\n* two\n\n"
+    "[key]: http://example.com/key\n"
+)
+
+
+def test_rules_are_counted_per_state():
+    profile = profiling.profile_lexer(DOCUMENT)
+    rules = profile.rules
+    assert rules[('INITIAL', 't_HEADING_START')].matches == 1
+    assert rules[('heading', 't_heading_PLAINTEXT')].matches == 1
+    assert rules[('link', 't_link_LINK_URL')].matches == 1
+    assert rules[('reflink', 't_reflink_REF_LINK_KEY')].matches == 1
+    assert rules[('list', 't_ULIST_ITEM_START')].matches == 1
+    # [link], [ref], [brackets] and [key]: all start as t_LINK_START, only
+    # the first one is a link
+    link_start = rules[('INITIAL', 't_LINK_START')]
+    assert link_start.matches == 4
+    assert link_start.retyped == 3
+    assert rules[('INITIAL', 't_COMMENT')].dropped == 1
+    assert rules[('INITIAL', 't_COMMENT')].bytes == len("<!-- a comment -->\n\n")
+
+
+def test_tokens_are_unchanged():
+    lexer = rydown.parser.MarkdownLexer()
+    lexer.reset()
+    lexer.lexer.input(DOCUMENT)
+    expected = [(t.type, t.value, t.lexpos) for t in lexer.lexer]
+    profile = profiling.LexerProfile()
+    profile.markdown_lexer.reset()
+    profile.markdown_lexer.lexer.input(DOCUMENT)
+    assert [(t.type, t.value, t.lexpos)
+            for t in profile.markdown_lexer.lexer] == expected
+    assert profile.run(DOCUMENT) == len(expected)
+
+
+def test_bytes_add_up():
+    profile = profiling.profile_lexer(DOCUMENT)
+    consumed = sum(stats.bytes for stats in profile.rules.values())
+    assert consumed == len(DOCUMENT) == profile.size
+
+
+def test_errors(capsys):
+    profile = profiling.profile_lexer("Text \\\n\n")
+    assert profile.errors['INITIAL'].calls == 1
+    assert profile.errors['INITIAL'].bytes == 1
+    assert 't_error' in profile.report()
+
+
+def test_report():
+    profile = profiling.profile_lexer(DOCUMENT)
+    profile.run(DOCUMENT)
+    assert profile.documents == 2
+    ranked = profile.ranked()
+    assert all(stats.matches for _, _, stats in ranked)
+    seconds = [stats.seconds for _, _, stats in ranked]
+    assert seconds == sorted(seconds, reverse=True)
+    assert len(profile.report(limit=3).splitlines()) == 6
+
+
+def test_grammar_profile():
+    profile = profiling.profile_grammar(DOCUMENT)
+    productions = profile.productions
+    assert productions['document -> document block'].reductions == 4
+    assert productions['heading -> HEADING_START phrase bothendlines'
+                       ].reductions == 1
+    assert productions['document -> document block'].action == 'p_document'
+    # Blocks are appended to the document's list, not copied
+    assert productions['document -> document block'].copied == 0
+    assert profile.shifts['HEADING_START'] == 1
+    assert profile.shifts['LINK_START'] == 1
+    assert profile.shifts['REF_LINK_START'] == 1
+
+
+def test_grammar_profile_tree_is_unchanged():
+    expected = rydown.parser.MarkdownParser()._parse_text(DOCUMENT, True)
+    assert profiling.GrammarProfile().run(DOCUMENT) == expected
+
+
+def test_copied():
+    old = [['text', 'a'], ['text', 'b']]
+    new = ['text', 'c']
+    # p[0] = p[1] + [p[2]]
+    assert profiling._copied(old + [new], [old, new]) == 3
+    # p[1].append(p[2]); p[0] = p[1]
+    assert profiling._copied(old, [old, new]) == 0
+    # A node made of a list of the right-hand side
+    assert profiling._copied(['paragraph', old], [old]) == 0
+    assert profiling._copied(['paragraph', [new]], [new]) == 1
+
+
+def test_grammar_report():
+    profile = profiling.profile_grammar(DOCUMENT)
+    for order in profiling.GrammarProfile.ORDERS:
+        assert 'p_document' in profile.report(order=order)
+    assert len(profile.report(limit=2).splitlines()) == 9
@@ -0,0 +1,117 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import rydown.parser as parser
+import rydown.serializer as serializer
+
+DOCUMENT = """# Heading 1
+
+A [link](https://www.example.com) with *emphasis* and "quotes".
+
+* apples
+  * oranges
+
+1. apples
+2. oranges
+
+> Markdown uses email-style > characters for blockquoting.
+
+a|b|c
+-|-|-
+d|e|f
+
+![Image](https://www.example.com/img.png)
+
+"""
+
+
+def _tree():
+    return parser.MarkdownParser().parse(DOCUMENT)
+
+
+def test_write_node_to_caller_buffer():
+    out = []
+    serializer.write_node(_tree(), out.append)
+    assert ''.join(out) == serializer.serialize(_tree())
+    assert len(out) > 1
+
+
+def test_write_wiki_node_to_caller_buffer():
+    out = []
+    serializer.write_wiki_node(_tree(), out.append)
+    assert ''.join(out) == serializer.mediawiki_serialize(_tree())
+
+
+def test_wiki_nested_markup():
+    resp = serializer.mediawiki_serialize(_tree())
+    assert "<p>A [https://www.example.com link] with '' emphasis '' and " \
+        "&ldquo;quotes&rdquo;.</p>\n" in resp
+    assert "*apples\n**oranges\n" in resp
+    assert '<span class="plainlinks">[{{fullurl:Image}} ' \
+        'https://www.example.com/img.png]</span>' in resp
+
+
+class _Chunks(object):
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+
+def test_serialize_to_writes_each_block():
+    fp = _Chunks()
+    tree = _tree()
+    serializer.serialize_to(tree, fp)
+    # HTML drops blockquotes, which makes no write
+    rendered = [serializer.serialize(block) for block in _tree()[1]]
+    assert fp.chunks == [chunk for chunk in rendered if chunk]
+    assert ''.join(fp.chunks) == serializer.serialize(_tree())
+
+
+def test_mediawiki_serialize_to_writes_each_block():
+    fp = _Chunks()
+    tree = _tree()
+    serializer.mediawiki_serialize_to(tree, fp)
+    assert len(fp.chunks) == len(tree[1])
+    assert ''.join(fp.chunks) == serializer.mediawiki_serialize(_tree())
+
+
+def test_renderer_handler_override():
+    class Plain(serializer.HtmlRenderer):
+        def write_link(self, node, write):
+            write('LINK:' + node[2])
+
+    html = Plain().render(_tree())
+    assert 'LINK:https://www.example.com' in html
+    assert '<a href' not in html
+    assert html.startswith('<h1>Heading 1</h1>')
+
+
+def test_renderer_handler_table():
+    renderer = serializer.MediaWikiRenderer()
+    renderer.handlers['text'] = lambda node, write: write(node[1].upper())
+    tree = parser.MarkdownParser().parse("one two three\n\n")
+    assert renderer.render(tree) == '<p>ONE TWO THREE</p>\n'
+    # Nodes without a handler write nothing
+    del renderer.handlers['paragraph']
+    assert renderer.render(tree) == ''
+
+
+def test_serialize_to_skips_empty_blocks():
+    fp = _Chunks()
+    tree = _tree()
+    # A block type without a handler renders nothing
+    tree[1].insert(1, ['unknown', []])
+    serializer.mediawiki_serialize_to(tree, fp)
+    assert len(fp.chunks) == len(tree[1]) - 1
+    serializer.serialize_to(tree, fp)
+    assert all(fp.chunks)
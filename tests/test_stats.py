@@ -0,0 +1,95 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+
+DOCUMENT = (
+    "# Heading\n\n"
+    "Some \"quoted\" text with *emphasis* and a [link](http://example.com).\n\n"
+    "\t:::python\n\tx = 1\n\n"
+    "\t:::c\n\tint x;\n\n"
+    "* one\n* two\n\n"
+)
+
+
+def test_output_is_unchanged():
+    engine = rydown.Engine()
+    stats = rydown.RenderStats()
+    assert engine.to_html(DOCUMENT, stats) == engine.to_html(DOCUMENT)
+    assert (engine.to_mediawiki(DOCUMENT, stats) ==
+            engine.to_mediawiki(DOCUMENT))
+
+
+def test_phases():
+    stats = rydown.RenderStats()
+    rydown.Engine().to_mediawiki(DOCUMENT, stats)
+    for phase in ('lex', 'parse', 'r_node', 'serialize', 'highlight',
+                  'typography', 'total'):
+        assert stats.calls(phase) > 0, phase
+        assert stats.seconds(phase) >= 0, phase
+    assert stats.calls('total') == 1
+    # One call per token, with the end of the input
+    assert stats.calls('lex') > 10
+    parts = sum(stats.seconds(phase) for phase in stats.phases
+                if phase != 'total')
+    assert parts <= stats.seconds('total')
+    assert 'highlight' in stats.report()
+
+
+def test_code_blocks():
+    stats = rydown.RenderStats()
+    rydown.Engine().to_html(DOCUMENT, stats)
+    assert stats.calls('highlight') == 2
+    assert [block[0] for block in stats.code_blocks] == ['python', 'c']
+    assert all(block[1] > 0 for block in stats.code_blocks)
+
+
+def test_stats_add_up():
+    engine = rydown.Engine()
+    stats = rydown.RenderStats()
+    engine.to_html(DOCUMENT, stats)
+    engine.to_html(DOCUMENT, stats)
+    assert stats.calls('total') == 2
+    assert len(stats.code_blocks) == 4
+    stats.clear()
+    assert stats.phases == {} and stats.code_blocks == []
+
+
+def test_module_functions():
+    stats = rydown.RenderStats()
+    assert rydown.to_html(DOCUMENT, stats=stats) == rydown.to_html(DOCUMENT)
+    assert stats.calls('total') == 1
+
+
+def test_code_block_handler_results_are_kept():
+    import time
+    serializer = rydown.serializer
+
+    class Captioned(serializer.HtmlRenderer):
+        def write_block_code(self, node, write):
+            write('<pre>')
+            time.sleep(0.01)
+            yield [['text', node[2]]]
+            time.sleep(0.01)
+            write('</pre>')
+
+    tree = rydown.Engine().parse(DOCUMENT)
+    renderer = Captioned()
+    stats = rydown.RenderStats()
+    html = renderer.render(tree, stats)
+    assert html == renderer.render(tree)
+    assert '<pre>python</pre>' in html
+    assert stats.calls('highlight') == 2
+    assert all(block[2] >= 0.02 for block in stats.code_blocks)
+
+    # A plain function may return the children to write
+    renderer.handlers['block_code'] = lambda node, write: [['text', 'x']]
+    assert (renderer.render(tree, rydown.RenderStats()) ==
+            renderer.render(tree))
+    assert 'x' in renderer.render(tree)
@@ -0,0 +1,109 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import io
+import pytest
+import rydown.parser as parser
+import rydown.serializer as serializer
+
+DOCUMENT = """# Heading 1
+
+A [link](https://www.example.com) with *emphasis* and "quotes".
+
+* apples
+  * oranges
+
+* pears
+
+```python
+x = 1
+
+y = 2
+```
+
+<!-- a comment
+
+with a blank line -->
+
+A [reference][id] used before its definition.
+
+[id]: http://example.com/
+
+1. apples
+2. oranges
+
+"""
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_split_blocks_keeps_fences_and_comments():
+    pieces = list(parser.split_blocks([DOCUMENT]))
+    assert ''.join(pieces) == DOCUMENT
+    assert pieces[2].startswith('* apples') and 'pears' in pieces[2]
+    assert pieces[3].startswith('```python') and 'y = 2' in pieces[3]
+    # The comment swallows the blank lines after it, so does this piece
+    assert pieces[4].startswith('<!--')
+    assert pieces[4].endswith('A [reference][id] used before its definition.\n\n')
+
+
+def test_split_blocks_ignores_chunk_boundaries():
+    whole = list(parser.split_blocks([DOCUMENT]))
+    for size in (1, 2, 7, 64):
+        assert list(parser.split_blocks(_chunks(DOCUMENT, size))) == whole
+
+
+def test_parse_iter_matches_parse():
+    engine = rydown.Engine()
+    expected = engine.parse(DOCUMENT)[1]
+    for size in (1, 5, 4096):
+        blocks = list(engine.parse_iter(iter(_chunks(DOCUMENT, size))))
+        assert blocks == expected
+
+
+def test_parse_iter_reads_file_objects():
+    engine = rydown.Engine()
+    expected = serializer.serialize(engine.parse(DOCUMENT))
+    if str is bytes:
+        fp = io.BytesIO(DOCUMENT)
+    else:
+        fp = io.StringIO(DOCUMENT)
+    blocks = engine.parse_iter(fp)
+    assert ''.join(serializer.serialize(b) for b in blocks) == expected
+
+
+def test_parse_iter_holds_blocks_until_defined():
+    engine = rydown.Engine()
+    blocks = engine.parse_iter(["[a][k]\n\nplain\n\n", "[k]: http://k.com/\n"])
+    first = next(blocks)
+    assert first[0] == 'paragraph'
+    assert first[1][0] == ['ref_link', [['text', 'a']], 'k', 'http://k.com/']
+
+
+def test_parse_iter_undefined_reference():
+    engine = rydown.Engine()
+    with pytest.raises(KeyError):
+        list(engine.parse_iter("[a][missing]\n\n"))
+
+
+def test_parse_block_leaves_references_alone():
+    markdown_parser = rydown.Engine().parser
+    markdown_parser.parse("[a][k]\n\n[k]: http://k.com/\n")
+    blocks, definitions = markdown_parser.parse_block(
+        "[b][j] and [c][k]\n\n[j]: http://j.com/\n", True)
+    assert definitions == [('j', 'http://j.com/')]
+    assert markdown_parser.ref_link_table == {'k': 'http://k.com/'}
+    assert sorted(markdown_parser.ref_link_keys(blocks[0])) == ['j', 'k']
+    assert blocks[0][1][0] == ['ref_link', [['text', 'b']], 'j']
+    markdown_parser.r_node(blocks[0], {'j': 'http://j.com/', 'k': 'K'})
+    assert blocks[0][1][0][3] == 'http://j.com/'
+    assert blocks[0][1][2][3] == 'K'
@@ -0,0 +1,37 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import rydown.lexer as lexer
+import rydown.tables as tables
+
+
+def test_generate_tables(tmpdir):
+    tables.generate(str(tmpdir))
+    assert tmpdir.join('lextab.py').check()
+    assert tmpdir.join('parsetab.py').check()
+    assert "_signature    = '%s'" % tables.lexer_signature(
+        lexer.MarkdownLexer) in tmpdir.join('lextab.py').read()
+
+
+def test_lexer_signature_follows_rules():
+    class ChangedLexer(lexer.MarkdownLexer):
+        t_LINK_SPECIAL_CHARS = r'[\[\]!]'
+
+    assert tables.lexer_signature(ChangedLexer) != \
+        tables.lexer_signature(lexer.MarkdownLexer)
+    assert tables.lexer_signature(lexer.MarkdownLexer) == \
+        tables.lexer_signature(lexer.MarkdownLexer)
+
+
+def test_parser_never_writes_tables():
+    package = os.path.dirname(os.path.abspath(rydown.__file__))
+    before = set(os.listdir(package))
+    rydown.Engine().to_mediawiki("# Heading 1\n")
+    assert set(os.listdir(package)) - before <= set(['__pycache__'])
@@ -0,0 +1,72 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import types
+
+DOCUMENT = (
+    "\n\n# Title\n\n"
+    "Some *em* and ```python\nx = 1\n```\n\n"
+    "<!-- a comment -->\n\n"
+    "* one\n* two [link](http://example.com)\n\n"
+    "\tcode\n\tmore code\n\n"
+    "a|b\n-|-\nc|d\n\n"
+    "The end\n"
+)
+
+
+def lexer_tokens(text):
+    lexer = rydown.parser.MarkdownLexer()
+    lexer.reset()
+    lexer.lexer.input(text.lstrip('\n'))
+    return [(t.type, t.value) for t in lexer.lexer]
+
+
+def test_same_tokens_as_the_lexer():
+    tokens = list(rydown.tokenize(DOCUMENT))
+    assert [(t.type, t.value) for t in tokens] == lexer_tokens(DOCUMENT)
+
+
+def test_offsets_and_lines():
+    tokens = list(rydown.tokenize(DOCUMENT))
+    for token in tokens:
+        assert token.start < token.end
+        assert token.line == DOCUMENT.count('\n', 0, token.start) + 1
+    # The fenced code token covers the whole block
+    code = [t for t in tokens if t.type == 'BLOCKERCODEONE'][0]
+    assert DOCUMENT[code.start:code.end] == "```python\nx = 1\n```"
+    heading = tokens[0]
+    assert (heading.type, heading.start, heading.line) == ('HEADING_START',
+                                                           2, 3)
+    # Only the comment is not covered by a token
+    covered = sum(t.end - t.start for t in tokens)
+    assert covered == len(DOCUMENT) - 2 - len("<!-- a comment -->\n\n")
+
+
+def test_tokens_are_tuples():
+    token = next(rydown.tokenize("word\n"))
+    assert token == ('PLAINTEXT', 'word', 0, 4, 1)
+    assert isinstance(token, rydown.Token)
+
+
+def test_lazy_and_independent():
+    first = rydown.tokenize(DOCUMENT)
+    assert isinstance(first, types.GeneratorType)
+    started = [next(first), next(first)]
+    # Another stream and a parse in between don't disturb the first one
+    assert len(list(rydown.tokenize("Other *text*\n"))) == 3
+    rydown.to_html(DOCUMENT)
+    rest = list(first)
+    assert ([(t.type, t.value) for t in started + rest] ==
+            lexer_tokens(DOCUMENT))
+
+
+def test_empty():
+    assert list(rydown.tokenize("")) == []
+    assert list(rydown.tokenize("\n\n \n")) == []
@@ -0,0 +1,43 @@
+""" Testing """
+# flake8: noqa
+import sys
+import os
+try:
+    import rydown
+except Exception as e:
+    sys.path.append(os.path.abspath('.'))
+    sys.path.append('/'.join([os.path.abspath('.'), 'rydown']))
+    import rydown
+import rydown.typography as typography
+
+
+def test_html_entities_and_dashes():
+    html = typography.html.transform
+    assert html("a & b &amp; &#12; <c>") == "a &amp; b &amp; &#12; &lt;c&gt;"
+    assert html("a---b--c-----d") == "a&mdash;b&ndash;c&mdash;&ndash;d"
+    assert html("one\ntwo") == "one two"
+
+
+def test_html_quotes():
+    html = typography.html.transform
+    assert html("\"Quotes\" and 'apostrophes'") == \
+        "&ldquo;Quotes&rdquo; and &lsquo;apostrophes&rsquo;"
+    assert html("it's \"'odd'\" x\"'y") == \
+        "it&rsquo;s &ldquo;&lsquo;odd&rsquo;&rdquo; x&rdquo;&rsquo;y"
+    assert html("'\"'") == "&lsquo;&rdquo;&rsquo;"
+
+
+def test_mediawiki_keeps_newlines_and_dashes():
+    wiki = typography.mediawiki.transform
+    assert wiki("one\n\"two\" -- three") == \
+        "one\n&rdquo;two&rdquo; -- three"
+
+
+def test_transform_many_matches_transform():
+    values = ["a '", "' b", "&", "amp; x", "-", "-", "\"", "", "c\n"]
+    for transformer in (typography.html, typography.mediawiki):
+        expected = [transformer.transform(v) for v in values]
+        assert transformer.transform_many(values) == expected
+    values = ["has \x00 separator", "'q'"]
+    assert typography.html.transform_many(values) == \
+        [typography.html.transform(v) for v in values]